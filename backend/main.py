@@ -4,64 +4,177 @@ Built with FastAPI, SQLite, and Gemini API
 """
 
 import os
-import json
+import asyncio
 import re
-from datetime import datetime, date, timedelta
+import random
+import hashlib
+import hmac
+from datetime import datetime, date, timedelta, timezone
 from typing import Optional, List
 from contextlib import asynccontextmanager
 from functools import lru_cache
+from itertools import accumulate
+from operator import itemgetter
 import time
 
 # Load .env file for environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException, Depends
+import numpy as np
+import orjson
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from cachetools import TLRUCache, TTLCache
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from sqlalchemy import create_engine, Column, Integer, String, Float, Date, DateTime, Text
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import event, func, case, or_, select, insert, delete, Index, Column, Integer, String, Float, Date, DateTime, JSON
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-import google.generativeai as genai
+from sqlalchemy.orm import joinedload, relationship
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.schema import CreateIndex, CreateTable
 
 # =============================================================================
 # Database Configuration
 # =============================================================================
 
-DATABASE_URL = "sqlite:///./planner.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Plain URLs (e.g. a host's postgres://...) are switched onto the async drivers
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+}
+DATABASE_URL = make_url(os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./planner.db"))
+DATABASE_URL = DATABASE_URL.set(drivername=ASYNC_DRIVERS.get(DATABASE_URL.drivername, DATABASE_URL.drivername))
+IS_SQLITE = DATABASE_URL.get_backend_name() == "sqlite"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))  # Connections kept open per worker
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # Extra connections allowed during bursts
+# Async engine so queries yield to the event loop instead of tying up threadpool workers.
+# Keep SQLite connections open across requests (skipping reconnect + PRAGMA setup).
+# Sized so bursts of concurrent requests get a connection instead of queueing;
+# WAL lets the pooled readers run alongside a writer.
+engine = create_async_engine(
+    DATABASE_URL,
+    # SQLite: wait on locks instead of failing
+    connect_args={"check_same_thread": False, "timeout": 30} if IS_SQLITE else {},
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=30,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    json_serializer=lambda value: orjson.dumps(value).decode(),
+    json_deserializer=orjson.loads
+)
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL journaling so commits don't fsync the whole database each time"""
+    if not IS_SQLITE:
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-64000")  # ~64 MB page cache
+    cursor.close()
+
+# Objects stay usable after commit; reloading expired attributes would need an await
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 # =============================================================================
-# Simple Cache for AI Responses (reduces API calls)
+# Simple Cache for AI and Endpoint Responses (reduces API calls and DB work)
 # =============================================================================
-_ai_cache = {}
+# When REDIS_URL is set the cache and the Gemini rate limiter are shared by
+# every worker process; otherwise (or while Redis is unreachable) they fall
+# back to in-process state.
+REDIS_URL = os.getenv("REDIS_URL")
+_redis = None  # Redis client, created in lifespan
+
 _cache_ttl = 300  # 5 minutes cache
-_last_api_call = 0
-_min_api_interval = 2  # Minimum seconds between API calls
+# Bounded; entries are stored as (ttl, value) and evicted once their own TTL passes.
+# Only touched from coroutines on the event loop, so it needs no lock.
+_ai_cache = TLRUCache(maxsize=2048, ttu=lambda key, entry, now: now + entry[0], timer=time.monotonic)
 
-def get_cached_response(cache_key: str):
-    """Get cached AI response if still valid"""
-    if cache_key in _ai_cache:
-        cached_time, cached_value = _ai_cache[cache_key]
-        if time.time() - cached_time < _cache_ttl:
-            return cached_value
-    return None
+_WHITESPACE_RE = re.compile(r"\s+")
 
-def set_cached_response(cache_key: str, value):
+def normalize_prompt(prompt: str) -> str:
+    """Canonical form of a prompt or cache key: trimmed, whitespace collapsed.
+
+    Case is kept: cached responses echo the task title / role back, so folding
+    case would hand one request another request's spelling.
+    """
+    return _WHITESPACE_RE.sub(" ", prompt.strip())
+
+def hash_cache_key(cache_key: str) -> str:
+    """Hash a cache key so long prompts aren't stored (and compared) verbatim"""
+    return hashlib.blake2b(normalize_prompt(cache_key).encode("utf-8"), digest_size=16).hexdigest()
+
+async def get_cached_response(cache_key: str):
+    """Get cached AI response if still valid"""
+    key = hash_cache_key(cache_key)
+    if _redis is not None:
+        try:
+            cached = await _redis.get(f"ai:{key}")
+            return orjson.loads(cached) if cached is not None else None
+        except RedisError as e:
+            print(f"⚠️ Redis cache unavailable, using local cache: {e}")
+    entry = _ai_cache.get(key)
+    return entry[1] if entry else None
+
+async def set_cached_response(cache_key: str, value, ttl: int = _cache_ttl):
     """Cache an AI response"""
-    _ai_cache[cache_key] = (time.time(), value)
+    key = hash_cache_key(cache_key)
+    if _redis is not None:
+        try:
+            await _redis.set(f"ai:{key}", orjson.dumps(value, default=jsonable_encoder), ex=ttl)
+            return
+        except RedisError as e:
+            print(f"⚠️ Redis cache unavailable, using local cache: {e}")
+    _ai_cache[key] = (ttl, value)
 
-def can_make_api_call():
-    """Check if enough time has passed since last API call"""
-    global _last_api_call
-    return time.time() - _last_api_call >= _min_api_interval
+async def get_cache_namespace(namespace: str) -> str:
+    """
+    Versioned prefix for a group of cached endpoint responses.
+    Bumping the version (invalidate_cache_namespace) orphans every key under it.
+    """
+    version = await get_cached_response(f"namespace:{namespace}") or 0
+    return f"{namespace}:v{version}"
+
+async def invalidate_cache_namespace(namespace: str):
+    """Drop all cached responses in a namespace"""
+    version = await get_cached_response(f"namespace:{namespace}") or 0
+    # Outlive every entry in the namespace so an old version can't come back
+    await set_cached_response(f"namespace:{namespace}", version + 1, ttl=24 * 3600)
+
+# Per-user lookups change rarely; writes invalidate the f"user:{user_id}" namespace
+USER_CACHE_TTL = 300
+STREAK_CACHE_TTL = 60
+PREFS_CACHE_TTL = 3600
 
-def mark_api_call():
-    """Mark that an API call was made"""
-    global _last_api_call
-    _last_api_call = time.time()
+def conditional_response(request: Request, response: Response, payload):
+    """
+    Tag a read-only payload with an ETag, or answer 304 if the client's copy matches.
+    Clients must revalidate every time (no-cache), so a write shows up on the next read.
+    """
+    etag = '"%s"' % hashlib.blake2b(orjson.dumps(payload, default=jsonable_encoder), digest_size=8).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return payload
 
 # =============================================================================
 # Database Models
@@ -74,8 +187,25 @@ class UserModel(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     email = Column(String(255), unique=True, nullable=False, index=True)
     name = Column(String(255), nullable=False)
-    password_hash = Column(String(255), nullable=False)  # Simple hash for demo
-    created_at = Column(DateTime, default=datetime.utcnow)
+    password_hash = Column(String(255), nullable=False)  # Argon2id (older accounts: SHA-256)
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+    
+    # Read-only one-to-one links (user_id has no FK constraint); load them eagerly,
+    # since a lazy load can't run implicitly under AsyncSession
+    streak = relationship(
+        "StreakModel",
+        primaryjoin="UserModel.id == foreign(StreakModel.user_id)",
+        uselist=False,
+        viewonly=True,
+        lazy="raise"
+    )
+    preferences = relationship(
+        "UserPreferencesModel",
+        primaryjoin="UserModel.id == foreign(UserPreferencesModel.user_id)",
+        uselist=False,
+        viewonly=True,
+        lazy="raise"
+    )
 
 
 class UserPreferencesModel(Base):
@@ -90,77 +220,98 @@ class UserPreferencesModel(Base):
     work_hours_end = Column(String(10), default="18:00")
     break_preference = Column(String(50))  # pomodoro, long_blocks, flexible
     biggest_challenge = Column(String(100))  # procrastination, distractions, overload, motivation
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+    updated_at = Column(DateTime, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
 
 
 class StreakModel(Base):
     """SQLAlchemy model for tracking user streaks"""
     __tablename__ = "streaks"
+    __table_args__ = (
+        Index("ux_streaks_user_id", "user_id", unique=True),  # One streak per user (upsert target)
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, nullable=False)
     current_streak = Column(Integer, default=0)
     longest_streak = Column(Integer, default=0)
     last_active_date = Column(Date, nullable=True)
     total_active_days = Column(Integer, default=0)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+    updated_at = Column(DateTime, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
 
 
 class DailyActivityModel(Base):
     """SQLAlchemy model for tracking daily activity"""
     __tablename__ = "daily_activity"
+    __table_args__ = (
+        Index("ix_daily_activity_user_date", "user_id", "date", unique=True),  # One row per user per day
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, nullable=False)
     date = Column(Date, nullable=False)
     tasks_completed = Column(Integer, default=0)
     tasks_created = Column(Integer, default=0)
     minutes_productive = Column(Integer, default=0)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.current_timestamp())
 
 
 class TaskModel(Base):
     """SQLAlchemy model for tasks table"""
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_user_status_deadline", "user_id", "status", "deadline"),
+        Index("ix_tasks_user_deadline", "user_id", "deadline"),  # Today's tasks per user (plan history)
+        Index("ix_tasks_status_priority", "status", "priority"),  # Status/priority filters and counts
+        Index("ix_tasks_deadline_priority", "deadline", "priority"),  # Task list sort, per-day and overdue counts
+        Index("ix_tasks_deadline_status", "deadline", "status"),  # Weekly chart counts without touching the table
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, nullable=True, index=True)  # Link to user
+    user_id = Column(Integer, nullable=True)  # Link to user
     title = Column(String(255), nullable=False)
     duration = Column(Float, nullable=False)  # Duration in hours
     priority = Column(String(50), nullable=False)  # low, medium, high
     deadline = Column(Date, nullable=False)
     preferred_time = Column(String(10), nullable=True)  # HH:MM format - user's preferred time
     status = Column(String(50), default="pending")  # pending, completed
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.current_timestamp())
 
 
 class ScheduleModel(Base):
     """SQLAlchemy model for schedule table"""
     __tablename__ = "schedule"
+    __table_args__ = (
+        Index("ix_schedule_user_date", "user_id", "date"),
+        Index("ix_schedule_date_start", "date", "start_time"),  # A day's schedule in time order
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, nullable=True, index=True)  # Link to user
+    user_id = Column(Integer, nullable=True)  # Link to user
     task_title = Column(String(255), nullable=False)
     start_time = Column(String(10), nullable=False)  # HH:MM format
     end_time = Column(String(10), nullable=False)  # HH:MM format
     date = Column(Date, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.current_timestamp())
 
 
 class PlanHistoryModel(Base):
     """SQLAlchemy model for storing user's plan history"""
     __tablename__ = "plan_history"
+    __table_args__ = (
+        Index("ux_plan_history_user_date", "user_id", "date", unique=True),  # One entry per user per day
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, nullable=False)
     date = Column(Date, nullable=False)
     total_tasks = Column(Integer, default=0)
     completed_tasks = Column(Integer, default=0)
-    schedule_data = Column(Text)  # JSON string of the schedule
-    wellness_tips = Column(Text)  # JSON string of wellness tips
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # JSON documents (JSONB on PostgreSQL), decoded by the driver on read
+    schedule_data = Column(JSON(none_as_null=True).with_variant(postgresql.JSONB(none_as_null=True), "postgresql"))
+    wellness_tips = Column(JSON(none_as_null=True).with_variant(postgresql.JSONB(none_as_null=True), "postgresql"))
+    created_at = Column(DateTime, server_default=func.current_timestamp())
 
 
 # =============================================================================
@@ -199,8 +350,13 @@ class TaskResponse(BaseModel):
     status: str
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+def rows_to_dicts(rows, schema: type[BaseModel]) -> List[dict]:
+    """Project ORM rows onto a response schema's fields without re-validating them"""
+    fields = tuple(schema.model_fields)
+    return [{field: getattr(row, field) for field in fields} for row in rows]
 
 
 class TaskUpdate(BaseModel):
@@ -224,8 +380,7 @@ class ScheduleResponse(BaseModel):
     end_time: str
     date: date
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ChatRequest(BaseModel):
@@ -272,8 +427,7 @@ class UserResponse(BaseModel):
     streak: Optional[dict] = None
     preferences: Optional[dict] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UserPreferencesCreate(BaseModel):
@@ -319,11 +473,13 @@ GEMINI_MODELS = [
     "gemini-1.0-pro",
 ]
 
+_genai = None  # google.generativeai, imported and configured on first use
 _working_model = None  # Cache the working model
+_gemini_model = None  # GenerativeModel instance for _working_model
 
 def get_gemini_model():
     """Configure and return Gemini model with fallback support"""
-    global _working_model
+    global _genai, _working_model, _gemini_model
     
     if not GEMINI_API_KEY:
         raise HTTPException(
@@ -331,46 +487,326 @@ def get_gemini_model():
             detail="GEMINI_API_KEY environment variable is not set"
         )
     
-    genai.configure(api_key=GEMINI_API_KEY)
+    # If we already found a working model, reuse its client
+    if _gemini_model is not None:
+        return _gemini_model
     
-    # If we already found a working model, use it
-    if _working_model:
-        return genai.GenerativeModel(_working_model)
+    # The SDK pulls in gRPC/protobuf, so only pay for the import once AI is actually used
+    if _genai is None:
+        import google.generativeai as genai
+        genai.configure(api_key=GEMINI_API_KEY)
+        _genai = genai
     
-    # Try each model until one works
-    for model_name in GEMINI_MODELS:
-        try:
-            model = genai.GenerativeModel(model_name)
-            # Test the model with a simple request
-            model.generate_content("test")
-            _working_model = model_name
-            print(f"✅ Using Gemini model: {model_name}")
-            return model
-        except Exception as e:
-            error_str = str(e)
-            # Skip to next model if not found or not supported
-            if "404" in error_str or "not found" in error_str.lower() or "not supported" in error_str.lower():
-                print(f"⚠️ Model {model_name} not available, trying next...")
-                continue
-            # For quota errors, still use this model (it exists, just rate limited)
-            if "429" in error_str or "quota" in error_str.lower():
-                _working_model = model_name
-                print(f"✅ Using Gemini model: {model_name} (quota limited, will retry)")
-                return genai.GenerativeModel(model_name)
-            # For other errors, try next model
-            print(f"⚠️ Model {model_name} error: {e}")
-            continue
+    _working_model = find_gemini_model()
+    _gemini_model = _genai.GenerativeModel(_working_model)
+    return _gemini_model
+
+
+def find_gemini_model() -> str:
+    """Pick the first preferred Gemini model this API key can use"""
+    # One metadata call (no generation quota used) tells us which models we can use
+    try:
+        supported = {
+            m.name.split("/")[-1]
+            for m in _genai.list_models()
+            if "generateContent" in m.supported_generation_methods
+        }
+        for model_name in GEMINI_MODELS:
+            if model_name in supported:
+                print(f"✅ Using Gemini model: {model_name}")
+                return model_name
+        print("⚠️ None of the preferred Gemini models are available")
+    except Exception as e:
+        print(f"⚠️ Could not list Gemini models: {e}")
     
     # Default fallback
-    _working_model = "gemini-pro"
     print(f"⚠️ Falling back to default model: gemini-pro")
-    return genai.GenerativeModel("gemini-pro")
+    return "gemini-pro"
 
 
 def reset_model_cache():
     """Reset the cached model (useful if model stops working)"""
-    global _working_model
+    global _working_model, _gemini_model
     _working_model = None
+    _gemini_model = None
+
+
+# =============================================================================
+# Gemini Rate Limiting
+# =============================================================================
+
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "15"))  # Requests per minute per model
+GEMINI_BURST = 5  # Requests allowed back-to-back before the bucket runs dry
+GEMINI_MAX_ATTEMPTS = 5  # Including the first try
+GEMINI_MAX_BACKOFF = 30  # Seconds
+
+_RETRY_DELAY_RE = re.compile(r"retry[_ -]?(?:after|delay)\D*(\d+(?:\.\d+)?)", re.IGNORECASE)
+_RETRYABLE_ERROR_RE = re.compile(r"429|quota|deadline", re.IGNORECASE)
+
+# Prompts that still hit the quota after every retry fail fast for a short while
+_ai_failure_cache = TTLCache(maxsize=1024, ttl=30)
+
+# Prompt hash -> Future for Gemini calls in progress, so identical concurrent
+# prompts share one API call. Only touched from the event loop, with no await
+# between the lookup and the insert, so it needs no lock.
+_inflight_ai_calls = {}
+
+# Atomic token bucket for Redis: refill, try to take one token, and return the
+# milliseconds to wait for the next token (0 when the token was taken)
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local penalty = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if penalty > 0 then
+    tokens = math.min(tokens, -penalty * rate)
+    wait = -1
+elseif tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity + penalty * rate) / rate) + 1)
+return wait
+"""
+
+
+def is_quota_error(error: Exception) -> bool:
+    """Whether a Gemini error means we're being rate limited"""
+    error_str = str(error)
+    return "429" in error_str or "quota" in error_str.lower()
+
+
+def is_model_not_found(error: Exception) -> bool:
+    """Whether a Gemini error means the model we picked is retired or not available to this key"""
+    return type(error).__name__ == "NotFound" or str(error).startswith("404")
+
+
+class TokenBucket:
+    """
+    Token bucket limiter for one Gemini model.
+    Uses Redis when available so every worker draws from the same bucket.
+    """
+
+    def __init__(self, name: str, capacity: float, refill_rate: float):
+        self.name = name
+        self.capacity = capacity
+        self.refill_rate = refill_rate  # Tokens per second
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+
+    def _take_local(self) -> float:
+        """Take a token from the in-process bucket, returning seconds to wait if empty"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate)
+        self.last_refill = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.refill_rate
+
+    async def _run(self, penalty: float = 0.0) -> float:
+        if _redis is not None:
+            try:
+                wait_ms = await _redis.eval(
+                    _TOKEN_BUCKET_LUA, 1, f"ai:bucket:{self.name}",
+                    self.capacity, self.refill_rate, time.time(), penalty
+                )
+                return max(0, int(wait_ms)) / 1000
+            except RedisError as e:
+                print(f"⚠️ Redis rate limiter unavailable, using local limiter: {e}")
+        if penalty > 0:
+            self.tokens = min(self.tokens, -penalty * self.refill_rate)
+            self.last_refill = time.monotonic()
+            return 0.0
+        return self._take_local()
+
+    async def try_acquire(self) -> bool:
+        """Take a token without waiting"""
+        return await self._run() == 0
+
+    async def acquire(self):
+        """Take a token, sleeping until one is available"""
+        while (wait := await self._run()) > 0:
+            await asyncio.sleep(wait)
+
+    async def penalize(self, delay: float):
+        """Drain the bucket so no calls go out for `delay` seconds (e.g. after a 429)"""
+        await self._run(penalty=delay)
+
+
+class AIMDLimiter:
+    """
+    Admission gate for concurrent Gemini calls.
+    The limit grows additively on success and halves on rate-limit errors.
+    """
+
+    def __init__(self, min_limit: float = 1, max_limit: float = 8, initial: float = 4):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = initial
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        self.limit = min(self.max_limit, self.limit + 0.5)
+
+    def on_throttled(self):
+        self.limit = max(self.min_limit, self.limit * 0.5)
+
+
+_gemini_buckets = {}  # Model name -> TokenBucket
+_gemini_concurrency = AIMDLimiter()
+
+
+def get_gemini_bucket(model_name: str) -> TokenBucket:
+    """Get (or create) the token bucket for a model"""
+    if model_name not in _gemini_buckets:
+        _gemini_buckets[model_name] = TokenBucket(model_name, GEMINI_BURST, GEMINI_RPM / 60)
+    return _gemini_buckets[model_name]
+
+
+async def generate_ai_content(prompt: str, wait: bool = True) -> Optional[str]:
+    """
+    Send a prompt to Gemini through the rate limiter and return the response text.
+    Quota and deadline errors are retried with jittered exponential backoff.
+    With wait=False, returns None instead of waiting when the bucket is empty
+    and doesn't retry.
+    Concurrent calls with the same prompt wait for the first one's result.
+    """
+    key = hash_cache_key(prompt)
+    while (inflight := _inflight_ai_calls.get(key)) is not None:
+        try:
+            return await asyncio.shield(inflight)
+        except asyncio.CancelledError:
+            # The request that started the call was cancelled, not this one; take over
+            if not inflight.cancelled():
+                raise
+    
+    future = asyncio.get_running_loop().create_future()
+    _inflight_ai_calls[key] = future
+    try:
+        result = await _call_gemini(prompt, wait)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # Mark retrieved so an unawaited future doesn't log a warning
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        del _inflight_ai_calls[key]
+
+
+async def _call_gemini(prompt: str, wait: bool) -> Optional[str]:
+    """Rate-limited, retrying Gemini call behind generate_ai_content"""
+    failure_key = hash_cache_key(prompt)
+    cached_error = _ai_failure_cache.get(failure_key)
+    if cached_error:
+        raise RuntimeError(f"Gemini quota exhausted, not retrying yet: {cached_error}")
+    
+    try:
+        return await _call_gemini_model(prompt, wait, failure_key)
+    except Exception as e:
+        if not is_model_not_found(e):
+            raise
+        # The model was retired while we were running: forget it and pick again, once
+        print(f"⚠️ Gemini model {_working_model} not found, choosing another: {e}")
+        reset_model_cache()
+        return await _call_gemini_model(prompt, wait, failure_key)
+
+
+async def _call_gemini_model(prompt: str, wait: bool, failure_key: str) -> Optional[str]:
+    """One pass of _call_gemini's rate-limited retries against the current model"""
+    # The first call imports the SDK and lists models (blocking network I/O),
+    # so run that in a worker thread rather than on the event loop
+    model = _gemini_model or await asyncio.to_thread(get_gemini_model)
+    bucket = get_gemini_bucket(_working_model)
+    attempts = GEMINI_MAX_ATTEMPTS if wait else 1
+    
+    for attempt in range(attempts):
+        if wait:
+            await bucket.acquire()
+        elif not await bucket.try_acquire():
+            return None
+        
+        async with _gemini_concurrency:
+            try:
+                # The SDK's async client keeps its gRPC channel open across calls
+                response = await model.generate_content_async(prompt)
+            except Exception as e:
+                if is_quota_error(e):
+                    _gemini_concurrency.on_throttled()
+                    # Honour the server's retry delay by draining the bucket for that long
+                    retry_match = _RETRY_DELAY_RE.search(str(e))
+                    if retry_match:
+                        await bucket.penalize(float(retry_match.group(1)))
+                if attempt + 1 >= attempts or not _RETRYABLE_ERROR_RE.search(str(e)):
+                    if is_quota_error(e):
+                        _ai_failure_cache[failure_key] = str(e)
+                    raise
+                print(f"⚠️ Gemini call failed (attempt {attempt + 1}/{attempts}), retrying: {e}")
+            else:
+                _gemini_concurrency.on_success()
+                return response.text.strip()
+        
+        # Full jitter keeps retries from concurrent requests from lining up
+        await asyncio.sleep(random.uniform(0, min(GEMINI_MAX_BACKOFF, 2 ** attempt)))
+
+
+async def stream_ai_content(prompt: str):
+    """
+    Stream a Gemini reply chunk by chunk through the same rate limiter.
+    Not retried or shared between identical prompts, since part of the reply
+    may already have been sent.
+    """
+    cached_error = _ai_failure_cache.get(hash_cache_key(prompt))
+    if cached_error:
+        raise RuntimeError(f"Gemini quota exhausted, not retrying yet: {cached_error}")
+    
+    model = _gemini_model or await asyncio.to_thread(get_gemini_model)
+    await get_gemini_bucket(_working_model).acquire()
+    async with _gemini_concurrency:
+        sent_any = False
+        for lookup in range(2):
+            try:
+                response = await model.generate_content_async(prompt, stream=True)
+                async for chunk in response:
+                    sent_any = True
+                    yield chunk.text
+            except Exception as e:
+                # Stale model choice: pick again once, as long as nothing has been sent
+                if lookup == 0 and not sent_any and is_model_not_found(e):
+                    print(f"⚠️ Gemini model {_working_model} not found, choosing another: {e}")
+                    reset_model_cache()
+                    model = await asyncio.to_thread(get_gemini_model)
+                    continue
+                if is_quota_error(e):
+                    _gemini_concurrency.on_throttled()
+                raise
+            else:
+                _gemini_concurrency.on_success()
+                return
 
 
 # Scheduling prompt template
@@ -420,6 +856,8 @@ Only return valid JSON.
 
 Tasks to schedule:
 """
+# Encoded once; the task list is appended as orjson bytes per request
+_SCHEDULING_PROMPT_BYTES = SCHEDULING_PROMPT.encode("utf-8")
 
 # Productivity assistant system prompt
 PRODUCTIVITY_PROMPT = """You are a helpful productivity assistant for a daily planner app.
@@ -433,18 +871,106 @@ You help users with:
 Be concise, practical, and encouraging in your responses.
 """
 
+# Canned /ai-chat replies used without an API key, keyed by message keyword (first listed wins)
+CHAT_FALLBACK_RESPONSES = {
+    "productive": "Try the Pomodoro Technique: work for 25 minutes, then take a 5-minute break. This helps maintain focus and prevents burnout!",
+    "focus": "Minimize distractions by turning off notifications, and try working in 90-minute focus blocks followed by short breaks.",
+    "overwhelm": "When feeling overwhelmed, start with your smallest task first. Completing it gives you momentum to tackle bigger challenges!",
+    "priorit": "Use the Eisenhower Matrix: categorize tasks as urgent/important, important/not urgent, urgent/not important, or neither. Focus on important tasks first!",
+    "break": "Taking regular breaks is essential! Step away from your desk, stretch, or take a short walk to refresh your mind.",
+    "default": "Great question! Here are some quick productivity tips: 1) Break large tasks into smaller ones, 2) Set specific goals for each work session, 3) Review your progress at the end of each day."
+}
+_CHAT_KEYWORD_RE = re.compile("|".join(map(re.escape, CHAT_FALLBACK_RESPONSES)))
+CHAT_ERROR_REPLY = "I'm here to help with productivity tips! Try asking about focus techniques, time management, or task prioritization."
+
+# Fallback scheduler ordering (higher runs first)
+PRIORITY_RANK = {"high": 3, "medium": 2, "low": 1}
+
+# Pull the JSON object/array out of a Gemini reply that may be wrapped in prose
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+_JSON_ARRAY_RE = re.compile(r"\[.*\]", re.DOTALL)
+
+
+def unwrap_json_fence(text: str) -> str:
+    """Return the body of a ```json fenced block, or the text unchanged if there is none"""
+    # Plain substring scans, so the regexes above only run over the JSON itself
+    _, fence, rest = text.partition("```json")
+    if not fence:
+        return text
+    return rest.partition("```")[0]
+
 
 # =============================================================================
 # Database Dependency
 # =============================================================================
 
-def get_db():
+async def get_db():
     """Database session dependency"""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def count_rows(db: AsyncSession, model, *criteria) -> int:
+    """SELECT COUNT(*) over a model's table, optionally filtered"""
+    return await db.scalar(select(func.count()).select_from(model).where(*criteria))
+
+
+# Task-wide counts shared by /stats, /stats/detailed, /smart-suggestion and /daily-summary,
+# keyed by date and the shared "tasks" namespace version, so a write on another worker
+# (which bumps the version in Redis) retires this worker's copy too. Dashboard polls a
+# few seconds apart reuse one result; task writes clear it.
+_task_stats_cache = TTLCache(maxsize=1, ttl=5)
+# Bumped by every task write, so an aggregate that was already running can't
+# store pre-write counts after the cache was cleared
+_task_stats_generation = 0
+
+def invalidate_task_stats():
+    """Drop the cached task stats after a task write"""
+    global _task_stats_generation
+    _task_stats_generation += 1
+    _task_stats_cache.clear()
+
+async def _compute_task_stats(db: AsyncSession, today: date) -> dict:
+    """Every task count the analytics endpoints need, from one aggregate query"""
+    key = (today, await get_cache_namespace("tasks"))
+    cached = _task_stats_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    generation = _task_stats_generation
+    row = (await db.execute(
+        select(
+            func.count().label("total"),
+            func.count().filter(TaskModel.status == "completed").label("completed"),
+            func.count().filter(TaskModel.status == "pending").label("pending"),
+            func.count().filter(TaskModel.priority == "high").label("high_priority"),
+            func.count().filter(TaskModel.priority == "medium").label("medium_priority"),
+            func.count().filter(TaskModel.priority == "low").label("low_priority"),
+            func.count().filter(TaskModel.priority == "high", TaskModel.status == "pending").label("high_priority_pending"),
+            func.count().filter(TaskModel.deadline == today).label("today_total"),
+            func.count().filter(TaskModel.deadline == today, TaskModel.status == "completed").label("today_completed"),
+            func.count().filter(TaskModel.deadline < today, TaskModel.status == "pending").label("overdue"),
+            func.avg(TaskModel.duration).label("avg_duration")
+        )
+    )).one()
+    stats = row._asdict()
+    if generation == _task_stats_generation:
+        _task_stats_cache[key] = stats
+    return stats
+
+
+SQLITE_MAX_VARIABLES = 999  # Bound-parameter limit of older SQLite builds
+
+async def insert_rows(db: AsyncSession, model, rows: List[dict]):
+    """
+    Bulk insert rows as multi-row INSERT ... VALUES statements,
+    chunked so each statement stays under SQLite's parameter limit.
+    """
+    if not rows:
+        return
+    chunk_size = max(1, SQLITE_MAX_VARIABLES // len(rows[0]))
+    for start in range(0, len(rows), chunk_size):
+        await db.execute(insert(model).values(rows[start:start + chunk_size]))
 
 
 # =============================================================================
@@ -452,15 +978,18 @@ def get_db():
 # =============================================================================
 
 def migrate_database():
-    """Run database migrations to add new columns"""
+    """Run database migrations to add new columns and indexes"""
     import sqlite3
     import os
     
-    # Only run migrations if database file exists
-    if not os.path.exists('planner.db'):
+    # Only run migrations if the configured SQLite database file exists
+    db_path = DATABASE_URL.database
+    if not IS_SQLITE or not db_path or db_path == ":memory:" or not os.path.exists(db_path):
         return
     
-    conn = sqlite3.connect('planner.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
     cursor = conn.cursor()
     
     try:
@@ -474,11 +1003,48 @@ def migrate_database():
         cursor.execute("PRAGMA table_info(tasks)")
         columns = [col[1] for col in cursor.fetchall()]
         
-        if 'preferred_time' not in columns:
-            print("📦 Adding preferred_time column to tasks table...")
-            cursor.execute("ALTER TABLE tasks ADD COLUMN preferred_time VARCHAR(10)")
-            conn.commit()
-            print("✅ Migration complete: preferred_time column added")
+        # All migration steps share one transaction (committed on exit)
+        with conn:
+            cursor.execute("BEGIN")
+            if 'preferred_time' not in columns:
+                print("📦 Adding preferred_time column to tasks table...")
+                cursor.execute("ALTER TABLE tasks ADD COLUMN preferred_time VARCHAR(10)")
+                print("✅ Migration complete: preferred_time column added")
+            
+            # Timestamps default in the database now; SQLite can't change a column's
+            # default in place, so rebuild tables created before that
+            for table in Base.metadata.sorted_tables:
+                cursor.execute(f"PRAGMA table_info({table.name})")
+                column_defaults = {col[1]: col[4] for col in cursor.fetchall()}
+                if "created_at" in column_defaults and column_defaults["created_at"] is None:
+                    print(f"📦 Rebuilding {table.name} table with timestamp defaults...")
+                    columns = ", ".join(name for name in column_defaults if name in table.c)
+                    cursor.execute(f"ALTER TABLE {table.name} RENAME TO _{table.name}_old")
+                    cursor.execute(str(CreateTable(table).compile(dialect=engine.dialect)))
+                    cursor.execute(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM _{table.name}_old")
+                    cursor.execute(f"DROP TABLE _{table.name}_old")
+            
+            # Keep one streak row per user and one history row per user per day (the first,
+            # which lookups have been reading) so the unique indexes can be built
+            cursor.execute(
+                "DELETE FROM streaks WHERE id NOT IN (SELECT MIN(id) FROM streaks GROUP BY user_id)"
+            )
+            cursor.execute(
+                "DELETE FROM plan_history WHERE id NOT IN (SELECT MIN(id) FROM plan_history GROUP BY user_id, date)"
+            )
+            
+            # Single-column user_id indexes are covered by the composite indexes that lead with it
+            for name in ("ix_tasks_user_id", "ix_schedule_user_id", "ix_daily_activity_user_id",
+                         "ix_plan_history_user_id", "ix_streaks_user_id"):
+                cursor.execute(f"DROP INDEX IF EXISTS {name}")
+            
+            # create_all skips tables that already exist, so add any indexes they're missing
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    try:
+                        cursor.execute(str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect)))
+                    except (sqlite3.IntegrityError, sqlite3.OperationalError) as e:
+                        print(f"⚠️ Could not create index {index.name}: {e}")
     except Exception as e:
         print(f"⚠️ Migration warning: {e}")
     finally:
@@ -493,33 +1059,56 @@ async def lifespan(app: FastAPI):
     print("🚀 AI-Powered Smart Daily Planner Backend")
     print("=" * 60)
     print("📦 Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
     print("✅ Database tables created successfully!")
     
     # Run migrations for existing databases
     migrate_database()
     
-    # Seed demo data if database is empty
-    db = SessionLocal()
-    try:
-        user_count = db.query(UserModel).count()
+    # Connect to the shared cache if configured
+    global _redis
+    if REDIS_URL:
+        _redis = aioredis.from_url(REDIS_URL, decode_responses=True)
+        try:
+            await _redis.ping()
+            print("✅ Redis cache connected")
+        except RedisError as e:
+            print(f"⚠️  Warning: Redis not reachable ({e}). Using in-process cache until it is.")
+    
+    # Seed demo data if database is empty (one transaction for the whole batch)
+    stale_namespaces = []
+    async with SessionLocal.begin() as db:
+        user_count = await count_rows(db, UserModel)
         print(f"📊 Found {user_count} users in database")
         import sys
         sys.stdout.flush()
         if user_count == 0:
             print("🌱 Seeding demo data...")
             sys.stdout.flush()
-            seed_demo_data(db)
+            demo_user_id = await seed_demo_data(db)
+            stale_namespaces = ["tasks", f"user:{demo_user_id}", f"history:{demo_user_id}"]
             print("✅ Demo data seeded successfully!")
             sys.stdout.flush()
         else:
             # Refresh demo user's streak to keep it active
-            refresh_demo_streak(db)
-    finally:
-        db.close()
+            demo_user_id = await refresh_demo_streak(db)
+            if demo_user_id is not None:
+                stale_namespaces = [f"user:{demo_user_id}", f"history:{demo_user_id}"]
+    
+    # Responses cached (e.g. in Redis) before the seed/refresh no longer match the database
+    for namespace in stale_namespaces:
+        await invalidate_cache_namespace(namespace)
+    invalidate_task_stats()
     
     if GEMINI_API_KEY:
         print("✅ Gemini API key detected")
+        # Build the shared model client now (SDK import + model lookup) so the
+        # first AI request doesn't pay for it; a failure here is retried on first use
+        try:
+            await asyncio.to_thread(get_gemini_model)
+        except Exception as e:
+            print(f"⚠️  Could not set up the Gemini model yet: {e}")
     else:
         print("⚠️  Warning: GEMINI_API_KEY not set. AI features will not work.")
     
@@ -532,28 +1121,40 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("\n👋 Shutting down server...")
+    await engine.dispose()
+    if _redis is not None:
+        await _redis.aclose()
 
 
-def refresh_demo_streak(db: Session):
-    """Refresh demo user's streak and history to keep it active for presentations"""
+async def refresh_demo_streak(db: AsyncSession):
+    """
+    Refresh demo user's streak and history to keep it active for presentations.
+    Runs inside the caller's transaction; returns the demo user's id (None if missing).
+    """
     from datetime import date, timedelta
     import random
-    import json
     
-    demo_user = db.query(UserModel).filter(UserModel.email == "demo@smartplanner.com").first()
-    if demo_user:
+    today = date.today()
+    
+    # Fetch the demo user and their streak in one round trip
+    row = (await db.execute(
+        select(UserModel, StreakModel)
+        .outerjoin(StreakModel, StreakModel.user_id == UserModel.id)
+        .where(UserModel.email == "demo@smartplanner.com")
+    )).first()
+    if row:
+        demo_user, streak = row
         # Refresh streak
-        streak = db.query(StreakModel).filter(StreakModel.user_id == demo_user.id).first()
         if streak:
-            streak.last_active_date = date.today()
+            streak.last_active_date = today
             streak.current_streak = 21  # Keep 21-day streak
             streak.longest_streak = 21
             streak.total_active_days = 45
-            db.commit()
+            await db.flush()
             print("✅ Demo user streak refreshed to 21 days")
         
         # Refresh plan history - delete old and add fresh 7 days
-        db.query(PlanHistoryModel).filter(PlanHistoryModel.user_id == demo_user.id).delete()
+        await db.execute(delete(PlanHistoryModel).where(PlanHistoryModel.user_id == demo_user.id))
         
         wellness_tips = [
             ["Take a 5-minute stretch break every hour", "Stay hydrated - aim for 8 glasses of water"],
@@ -584,75 +1185,85 @@ def refresh_demo_streak(db: Session):
             ]
         ]
         
+        history_rows = []
         for i in range(7):
-            day = date.today() - timedelta(days=i)
+            day = today - timedelta(days=i)
             total = random.randint(6, 10)
             completed = random.randint(5, total)
-            history = PlanHistoryModel(
-                user_id=demo_user.id,
-                date=day,
-                total_tasks=total,
-                completed_tasks=completed,
-                schedule_data=json.dumps(random.choice(sample_schedules)),
-                wellness_tips=json.dumps(random.choice(wellness_tips))
-            )
-            db.add(history)
-        
-        db.commit()
+            history_rows.append({
+                "user_id": demo_user.id,
+                "date": day,
+                "total_tasks": total,
+                "completed_tasks": completed,
+                "schedule_data": random.choice(sample_schedules),
+                "wellness_tips": random.choice(wellness_tips)
+            })
+        await insert_rows(db, PlanHistoryModel, history_rows)
         print("✅ Demo user plan history refreshed (7 days)")
+        return demo_user.id
+    return None
 
 
-def seed_demo_data(db: Session):
-    """Seed database with demo data for hackathon presentation"""
-    from datetime import datetime, date, timedelta
-    import random
-    import json
+async def seed_demo_data(db: AsyncSession):
+    """
+    Seed database with demo data for hackathon presentation.
+    Runs inside the caller's transaction; returns the demo user's id.
+    """
+    from datetime import date, timedelta
+    
+    today = date.today()
     
-    # Create demo user
-    demo_user = UserModel(
-        email="demo@smartplanner.com",
-        name="Alex Johnson",
-        password_hash=hash_password("demo123")
+    # Draw all the random demo numbers up front in vectorized calls
+    rng = np.random.default_rng(42)
+    
+    # Create demo user (rows below are bulk inserted, so only the id is needed)
+    demo_email = "demo@smartplanner.com"
+    user_id = await db.scalar(
+        insert(UserModel).returning(UserModel.id),
+        {
+            "email": demo_email,
+            "name": "Alex Johnson",
+            "password_hash": DEMO_PASSWORD_HASH
+        }
     )
-    db.add(demo_user)
-    db.commit()
-    db.refresh(demo_user)
     
     # Add user preferences
-    preferences = UserPreferencesModel(
-        user_id=demo_user.id,
-        work_style="early_bird",
-        productivity_goal="focus",
-        work_hours_start="08:00",
-        work_hours_end="18:00",
-        break_preference="pomodoro",
-        biggest_challenge="distractions"
-    )
-    db.add(preferences)
+    await db.execute(insert(UserPreferencesModel), {
+        "user_id": user_id,
+        "work_style": "early_bird",
+        "productivity_goal": "focus",
+        "work_hours_start": "08:00",
+        "work_hours_end": "18:00",
+        "break_preference": "pomodoro",
+        "biggest_challenge": "distractions"
+    })
     
     # Create streak data (21-day streak!)
-    streak = StreakModel(
-        user_id=demo_user.id,
-        current_streak=21,
-        longest_streak=21,
-        total_active_days=45,
-        last_active_date=date.today()
-    )
-    db.add(streak)
+    await db.execute(insert(StreakModel), {
+        "user_id": user_id,
+        "current_streak": 21,
+        "longest_streak": 21,
+        "total_active_days": 45,
+        "last_active_date": today
+    })
     
     # Add daily activity for past 45 days
-    for i in range(45):
-        day = date.today() - timedelta(days=i)
-        tasks_done = random.randint(5, 12)
-        tasks_made = random.randint(8, 15)
-        activity = DailyActivityModel(
-            user_id=demo_user.id,
-            date=day,
-            tasks_completed=tasks_done,
-            tasks_created=tasks_made,
-            minutes_productive=random.randint(180, 420)
+    activity_tasks_done = rng.integers(5, 13, size=45).tolist()
+    activity_tasks_made = rng.integers(8, 16, size=45).tolist()
+    activity_minutes = rng.integers(180, 421, size=45).tolist()
+    activity_rows = [
+        {
+            "user_id": user_id,
+            "date": today - timedelta(days=i),
+            "tasks_completed": tasks_done,
+            "tasks_created": tasks_made,
+            "minutes_productive": minutes
+        }
+        for i, tasks_done, tasks_made, minutes in zip(
+            range(45), activity_tasks_done, activity_tasks_made, activity_minutes
         )
-        db.add(activity)
+    ]
+    await insert_rows(db, DailyActivityModel, activity_rows)
     
     # Add historical tasks across past 30 days
     task_templates = [
@@ -678,24 +1289,26 @@ def seed_demo_data(db: Session):
         ("Technical debt cleanup", "low", 1.5),
     ]
     
-    for i in range(30):
-        day = date.today() - timedelta(days=i)
-        # Add 4-8 tasks per day
-        num_tasks = random.randint(4, 8)
-        selected_tasks = random.sample(task_templates, min(num_tasks, len(task_templates)))
-        
-        for title, priority, duration in selected_tasks:
-            # Most past tasks are completed
-            status = "completed" if random.random() < 0.85 else "pending"
-            task = TaskModel(
-                title=f"{title}",
-                duration=duration,
-                priority=priority,
-                deadline=day,
-                status=status,
-                user_id=demo_user.id
-            )
-            db.add(task)
+    # Add 4-8 tasks per day, each day drawing its own ordering of the templates
+    tasks_per_day = rng.integers(4, 9, size=30).tolist()
+    template_orders = rng.random((30, len(task_templates))).argsort(axis=1).tolist()
+    # Most past tasks are completed
+    completed_draws = iter((rng.random(sum(tasks_per_day)) < 0.85).tolist())
+    
+    task_rows = []
+    for i, num_tasks, order in zip(range(30), tasks_per_day, template_orders):
+        day = today - timedelta(days=i)
+        for template_index in order[:num_tasks]:
+            title, priority, duration = task_templates[template_index]
+            status = "completed" if next(completed_draws) else "pending"
+            task_rows.append({
+                "title": title,
+                "duration": duration,
+                "priority": priority,
+                "deadline": day,
+                "status": status,
+                "user_id": user_id
+            })
     
     # Add today's schedule
     today_tasks = [
@@ -709,15 +1322,16 @@ def seed_demo_data(db: Session):
         ("End of day review", "17:00", "17:30", "Plan tomorrow")
     ]
     
-    for task_title, start, end, notes in today_tasks:
-        schedule_item = ScheduleModel(
-            task_title=task_title,
-            start_time=start,
-            end_time=end,
-            date=date.today(),
-            user_id=demo_user.id
-        )
-        db.add(schedule_item)
+    await insert_rows(db, ScheduleModel, [
+        {
+            "task_title": task_title,
+            "start_time": start,
+            "end_time": end,
+            "date": today,
+            "user_id": user_id
+        }
+        for task_title, start, end, notes in today_tasks
+    ])
     
     # Add today's active tasks
     today_active_tasks = [
@@ -732,15 +1346,15 @@ def seed_demo_data(db: Session):
     ]
     
     for title, priority, duration, status in today_active_tasks:
-        task = TaskModel(
-            title=title,
-            duration=duration,
-            priority=priority,
-            deadline=date.today(),
-            status=status,
-            user_id=demo_user.id
-        )
-        db.add(task)
+        task_rows.append({
+            "title": title,
+            "duration": duration,
+            "priority": priority,
+            "deadline": today,
+            "status": status,
+            "user_id": user_id
+        })
+    await insert_rows(db, TaskModel, task_rows)
     
     # Add plan history for past 7 days
     wellness_tips = [
@@ -750,26 +1364,30 @@ def seed_demo_data(db: Session):
         ["Try the 20-20-20 rule for eye health", "Get some natural light exposure"],
     ]
     
-    for i in range(7):
-        day = date.today() - timedelta(days=i)
-        total = random.randint(5, 10)
-        completed = random.randint(4, min(8, total))
-        history = PlanHistoryModel(
-            user_id=demo_user.id,
-            date=day,
-            total_tasks=total,
-            completed_tasks=completed,
-            schedule_data=json.dumps([{"task": "Sample task", "start": "09:00", "end": "10:00"}]),
-            wellness_tips=json.dumps(random.choice(wellness_tips))
+    history_totals = rng.integers(5, 11, size=7)
+    history_completed = rng.integers(4, np.minimum(8, history_totals) + 1).tolist()
+    history_tips = rng.integers(len(wellness_tips), size=7).tolist()
+    history_rows = [
+        {
+            "user_id": user_id,
+            "date": today - timedelta(days=i),
+            "total_tasks": total,
+            "completed_tasks": completed,
+            "schedule_data": [{"task": "Sample task", "start": "09:00", "end": "10:00"}],
+            "wellness_tips": wellness_tips[tip_index]
+        }
+        for i, total, completed, tip_index in zip(
+            range(7), history_totals.tolist(), history_completed, history_tips
         )
-        db.add(history)
+    ]
+    await insert_rows(db, PlanHistoryModel, history_rows)
     
-    db.commit()
-    print(f"   Created demo user: {demo_user.email} (password: demo123)")
+    print(f"   Created demo user: {demo_email} (password: demo123)")
     print(f"   Added 21-day streak")
     print(f"   Added 45 days of activity history")
     print(f"   Added 150+ historical tasks")
     print(f"   Added today's schedule and active tasks")
+    return user_id
 
 
 # =============================================================================
@@ -780,7 +1398,8 @@ app = FastAPI(
     title="AI-Powered Smart Daily Planner",
     description="A smart daily planner backend with AI-powered scheduling and productivity assistance",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS Middleware for frontend
@@ -808,13 +1427,14 @@ async def root():
 
 
 @app.get("/health", tags=["Health"])
-async def health_check():
+async def health_check(response: Response):
     """Detailed health check"""
+    response.headers["Cache-Control"] = "public, max-age=60"
     return {
         "status": "healthy",
         "database": "connected",
         "gemini_configured": bool(GEMINI_API_KEY),
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
 
@@ -822,37 +1442,63 @@ async def health_check():
 # 🔐 Authentication APIs
 # =============================================================================
 
+password_hasher = PasswordHasher(time_cost=3, memory_cost=64 * 1024, parallelism=4)
+
+# Argon2id hash of the demo account's "demo123", precomputed so seeding skips the KDF
+DEMO_PASSWORD_HASH = "$argon2id$v=19$m=65536,t=3,p=4$T/mRFjXcGVYVG19PrgPMyQ$LF5JxWEmi+9HCB8ebbejLkrv/bsEl0AuH6ua4Hudwnc"
+
+
 def hash_password(password: str) -> str:
-    """Simple password hashing for demo purposes"""
-    import hashlib
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash a password with Argon2id"""
+    return password_hasher.hash(password)
+
+
+def verify_password(password_hash: str, password: str) -> bool:
+    """Check a password against a stored Argon2id (or legacy SHA-256) hash"""
+    if password_hash.startswith("$argon2"):
+        try:
+            return password_hasher.verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    # Accounts created before Argon2 store an unsalted SHA-256 hex digest
+    # (constant-time compare; PasswordHasher.verify already is)
+    return hmac.compare_digest(password_hash.encode(), hashlib.sha256(password.encode()).hexdigest().encode())
+
+
+def password_needs_rehash(password_hash: str) -> bool:
+    """True for legacy SHA-256 hashes and Argon2 hashes made with older parameters"""
+    if not password_hash.startswith("$argon2"):
+        return True
+    try:
+        return password_hasher.check_needs_rehash(password_hash)
+    except InvalidHashError:
+        return True
 
 
 @app.post("/auth/register", tags=["Authentication"])
-async def register_user(user: UserRegister, db: Session = Depends(get_db)):
+async def register_user(user: UserRegister, db: AsyncSession = Depends(get_db)):
     """
     Register a new user.
     """
     try:
-        # Check if user already exists
-        existing_user = db.query(UserModel).filter(UserModel.email == user.email).first()
-        if existing_user:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
-        # Create new user
+        # Create new user; the unique email index rejects an existing account,
+        # so there's no separate lookup first
         db_user = UserModel(
             email=user.email,
             name=user.name,
-            password_hash=hash_password(user.password)
+            password_hash=await run_in_threadpool(hash_password, user.password)
         )
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        try:
+            await db.flush()  # Assigns db_user.id; user and streak commit together
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="Email already registered")
         
         # Create initial streak record
         db_streak = StreakModel(user_id=db_user.id)
         db.add(db_streak)
-        db.commit()
+        await db.commit()
         
         return {
             "message": "User registered successfully",
@@ -865,23 +1511,34 @@ async def register_user(user: UserRegister, db: Session = Depends(get_db)):
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
 
 @app.post("/auth/login", tags=["Authentication"])
-async def login_user(user: UserLogin, db: Session = Depends(get_db)):
+async def login_user(user: UserLogin, db: AsyncSession = Depends(get_db)):
     """
     Login user and return user data with streak info.
     """
     try:
-        db_user = db.query(UserModel).filter(UserModel.email == user.email).first()
+        # User, streak and preferences in one query
+        db_user = await db.scalar(
+            select(UserModel)
+            .options(joinedload(UserModel.streak), joinedload(UserModel.preferences))
+            .where(UserModel.email == user.email)
+        )
         
-        if not db_user or db_user.password_hash != hash_password(user.password):
+        # Argon2 is deliberately slow and memory-hard, so keep it off the event loop
+        if not db_user or not await run_in_threadpool(verify_password, db_user.password_hash, user.password):
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
+        # Upgrade legacy SHA-256 (or outdated Argon2) hashes now that we have the plain password
+        if password_needs_rehash(db_user.password_hash):
+            db_user.password_hash = await run_in_threadpool(hash_password, user.password)
+            await db.commit()
+        
         # Get streak info
-        streak = db.query(StreakModel).filter(StreakModel.user_id == db_user.id).first()
+        streak = db_user.streak
         streak_data = None
         if streak:
             today = date.today()
@@ -902,7 +1559,7 @@ async def login_user(user: UserLogin, db: Session = Depends(get_db)):
             }
         
         # Get preferences
-        prefs = db.query(UserPreferencesModel).filter(UserPreferencesModel.user_id == db_user.id).first()
+        prefs = db_user.preferences
         prefs_data = None
         if prefs:
             prefs_data = {
@@ -933,20 +1590,29 @@ async def login_user(user: UserLogin, db: Session = Depends(get_db)):
 
 
 @app.get("/auth/user/{user_id}", tags=["Authentication"])
-async def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Get user data by ID.
     """
     try:
-        db_user = db.query(UserModel).filter(UserModel.id == user_id).first()
+        cache_key = f"{await get_cache_namespace(f'user:{user_id}')}:user"
+        cached = await get_cached_response(cache_key)
+        if cached:
+            return cached
+        
+        # User, streak and preferences in one query
+        db_user = await db.scalar(
+            select(UserModel)
+            .options(joinedload(UserModel.streak), joinedload(UserModel.preferences))
+            .where(UserModel.id == user_id)
+        )
         if not db_user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Get streak and preferences
-        streak = db.query(StreakModel).filter(StreakModel.user_id == user_id).first()
-        prefs = db.query(UserPreferencesModel).filter(UserPreferencesModel.user_id == user_id).first()
+        streak = db_user.streak
+        prefs = db_user.preferences
         
-        return {
+        response_data = {
             "user": {
                 "id": db_user.id,
                 "email": db_user.email,
@@ -959,6 +1625,8 @@ async def get_user(user_id: int, db: Session = Depends(get_db)):
             } if streak else None,
             "has_completed_onboarding": prefs is not None
         }
+        await set_cached_response(cache_key, response_data, ttl=USER_CACHE_TTL)
+        return response_data
     except HTTPException:
         raise
     except Exception as e:
@@ -970,13 +1638,13 @@ async def get_user(user_id: int, db: Session = Depends(get_db)):
 # =============================================================================
 
 @app.post("/preferences/{user_id}", tags=["Onboarding"])
-async def save_preferences(user_id: int, prefs: UserPreferencesCreate, db: Session = Depends(get_db)):
+async def save_preferences(user_id: int, prefs: UserPreferencesCreate, db: AsyncSession = Depends(get_db)):
     """
     Save user preferences from onboarding.
     """
     try:
         # Check if preferences already exist
-        existing = db.query(UserPreferencesModel).filter(UserPreferencesModel.user_id == user_id).first()
+        existing = await db.scalar(select(UserPreferencesModel).where(UserPreferencesModel.user_id == user_id))
         
         if existing:
             # Update existing preferences
@@ -986,7 +1654,7 @@ async def save_preferences(user_id: int, prefs: UserPreferencesCreate, db: Sessi
             existing.work_hours_end = prefs.work_hours_end
             existing.break_preference = prefs.break_preference
             existing.biggest_challenge = prefs.biggest_challenge
-            existing.updated_at = datetime.utcnow()
+            existing.updated_at = func.current_timestamp()
         else:
             # Create new preferences
             db_prefs = UserPreferencesModel(
@@ -1000,7 +1668,8 @@ async def save_preferences(user_id: int, prefs: UserPreferencesCreate, db: Sessi
             )
             db.add(db_prefs)
         
-        db.commit()
+        await db.commit()
+        await invalidate_cache_namespace(f"user:{user_id}")
         
         return {
             "message": "Preferences saved successfully",
@@ -1014,22 +1683,34 @@ async def save_preferences(user_id: int, prefs: UserPreferencesCreate, db: Sessi
             }
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to save preferences: {str(e)}")
 
 
 @app.get("/preferences/{user_id}", tags=["Onboarding"])
-async def get_preferences(user_id: int, db: Session = Depends(get_db)):
+async def get_preferences(
+    user_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
     """
     Get user preferences.
     """
     try:
-        prefs = db.query(UserPreferencesModel).filter(UserPreferencesModel.user_id == user_id).first()
+        cache_key = f"{await get_cache_namespace(f'user:{user_id}')}:prefs"
+        cached = await get_cached_response(cache_key)
+        if cached:
+            return conditional_response(request, response, cached)
+        
+        prefs = await db.scalar(select(UserPreferencesModel).where(UserPreferencesModel.user_id == user_id))
         
         if not prefs:
-            return {"preferences": None, "has_completed_onboarding": False}
+            response_data = {"preferences": None, "has_completed_onboarding": False}
+            await set_cached_response(cache_key, response_data, ttl=PREFS_CACHE_TTL)
+            return conditional_response(request, response, response_data)
         
-        return {
+        response_data = {
             "preferences": {
                 "work_style": prefs.work_style,
                 "productivity_goal": prefs.productivity_goal,
@@ -1040,6 +1721,8 @@ async def get_preferences(user_id: int, db: Session = Depends(get_db)):
             },
             "has_completed_onboarding": True
         }
+        await set_cached_response(cache_key, response_data, ttl=PREFS_CACHE_TTL)
+        return conditional_response(request, response, response_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get preferences: {str(e)}")
 
@@ -1049,19 +1732,31 @@ async def get_preferences(user_id: int, db: Session = Depends(get_db)):
 # =============================================================================
 
 @app.get("/streak/{user_id}", tags=["Streaks"])
-async def get_streak(user_id: int, db: Session = Depends(get_db)):
+async def get_streak(
+    user_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
     """
     Get user's current streak information.
     """
     try:
-        streak = db.query(StreakModel).filter(StreakModel.user_id == user_id).first()
+        cache_key = f"{await get_cache_namespace(f'user:{user_id}')}:streak"
+        cached = await get_cached_response(cache_key)
+        if cached:
+            return conditional_response(request, response, cached)
+        
+        streak = await db.scalar(select(StreakModel).where(StreakModel.user_id == user_id))
         
         if not streak:
             # Create new streak if doesn't exist
             streak = StreakModel(user_id=user_id)
             db.add(streak)
-            db.commit()
-            db.refresh(streak)
+            await db.commit()
+            await db.refresh(streak)
+            await invalidate_cache_namespace(f"user:{user_id}")
+            cache_key = f"{await get_cache_namespace(f'user:{user_id}')}:streak"
         
         today = date.today()
         streak_status = "broken"
@@ -1073,62 +1768,77 @@ async def get_streak(user_id: int, db: Session = Depends(get_db)):
             elif days_since == 1:
                 streak_status = "at_risk"
         
-        return {
+        response_data = {
             "current_streak": streak.current_streak,
             "longest_streak": streak.longest_streak,
             "total_active_days": streak.total_active_days,
             "last_active_date": streak.last_active_date.isoformat() if streak.last_active_date else None,
             "streak_status": streak_status
         }
+        await set_cached_response(cache_key, response_data, ttl=STREAK_CACHE_TTL)
+        return conditional_response(request, response, response_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get streak: {str(e)}")
 
 
 @app.post("/streak/{user_id}/checkin", tags=["Streaks"])
-async def checkin_streak(user_id: int, db: Session = Depends(get_db)):
+async def checkin_streak(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Check in for today to maintain/start streak.
     Called when user completes a task or generates a schedule.
     """
     try:
-        streak = db.query(StreakModel).filter(StreakModel.user_id == user_id).first()
-        
-        if not streak:
-            streak = StreakModel(user_id=user_id)
-            db.add(streak)
-        
         today = date.today()
         
-        if streak.last_active_date:
-            days_since = (today - streak.last_active_date).days
-            
-            if days_since == 0:
-                # Already checked in today
-                return {
-                    "message": "Already checked in today",
-                    "current_streak": streak.current_streak,
-                    "longest_streak": streak.longest_streak,
-                    "streak_maintained": True
-                }
-            elif days_since == 1:
-                # Consecutive day - increase streak
-                streak.current_streak += 1
-                streak.total_active_days += 1
-                if streak.current_streak > streak.longest_streak:
-                    streak.longest_streak = streak.current_streak
-            else:
-                # Streak broken - reset to 1
-                streak.current_streak = 1
-                streak.total_active_days += 1
-        else:
-            # First check-in ever
-            streak.current_streak = 1
-            streak.total_active_days = 1
-            streak.longest_streak = 1
+        # Consecutive day extends the streak; a gap (or first check-in) restarts it at 1
+        new_streak = case(
+            (StreakModel.last_active_date == today - timedelta(days=1), StreakModel.current_streak + 1),
+            else_=1
+        )
+        upsert = (sqlite.insert if IS_SQLITE else postgresql.insert)(StreakModel).values(
+            user_id=user_id,
+            current_streak=1,
+            longest_streak=1,
+            total_active_days=1,
+            last_active_date=today
+        )
+        # One atomic statement, so concurrent check-ins can't double count. The WHERE
+        # skips users already checked in today; they get no row back from RETURNING.
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[StreakModel.user_id],
+            set_={
+                "current_streak": new_streak,
+                "longest_streak": case(
+                    (new_streak > StreakModel.longest_streak, new_streak),
+                    else_=StreakModel.longest_streak
+                ),
+                "total_active_days": case(
+                    (StreakModel.last_active_date.is_(None), 1),
+                    else_=StreakModel.total_active_days + 1
+                ),
+                "last_active_date": today,
+                "updated_at": func.current_timestamp()
+            },
+            where=or_(StreakModel.last_active_date.is_(None), StreakModel.last_active_date != today)
+        ).returning(StreakModel.current_streak, StreakModel.longest_streak, StreakModel.total_active_days)
+        
+        streak = (await db.execute(upsert)).first()
+        await db.commit()
+        
+        if streak is None:
+            # Already checked in today
+            streak = (await db.execute(
+                select(StreakModel.current_streak, StreakModel.longest_streak)
+                .where(StreakModel.user_id == user_id)
+            )).first()
+            return {
+                "message": "Already checked in today",
+                "current_streak": streak.current_streak,
+                "longest_streak": streak.longest_streak,
+                "streak_maintained": True
+            }
         
-        streak.last_active_date = today
-        streak.updated_at = datetime.utcnow()
-        db.commit()
+        await invalidate_cache_namespace(f"user:{user_id}")
         
         return {
             "message": "Streak updated!",
@@ -1138,7 +1848,7 @@ async def checkin_streak(user_id: int, db: Session = Depends(get_db)):
             "streak_maintained": True
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to update streak: {str(e)}")
 
 
@@ -1147,86 +1857,112 @@ async def checkin_streak(user_id: int, db: Session = Depends(get_db)):
 # =============================================================================
 
 @app.get("/history/{user_id}", tags=["History"])
-async def get_plan_history(user_id: int, limit: int = 10, db: Session = Depends(get_db)):
+async def get_plan_history(
+    user_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(10, ge=1, le=100),
+    summary: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
     """
     Get user's plan history.
+    
+    - **summary**: Only return the task counts, without each day's schedule and wellness tips
     """
     try:
-        history = db.query(PlanHistoryModel).filter(
-            PlanHistoryModel.user_id == user_id
-        ).order_by(PlanHistoryModel.date.desc()).limit(limit).all()
-        
-        return {
-            "history": [
-                {
-                    "id": h.id,
-                    "date": h.date.isoformat(),
-                    "total_tasks": h.total_tasks,
-                    "completed_tasks": h.completed_tasks,
-                    "completion_rate": round((h.completed_tasks / h.total_tasks * 100) if h.total_tasks > 0 else 0, 1),
-                    "schedule": json.loads(h.schedule_data) if h.schedule_data else [],
-                    "wellness_tips": json.loads(h.wellness_tips) if h.wellness_tips else []
-                }
-                for h in history
-            ]
-        }
+        # Served from cache until the user saves a new plan (or it expires)
+        cache_key = f"{await get_cache_namespace(f'history:{user_id}')}:{limit}:{summary}"
+        cached = await get_cached_response(cache_key)
+        if cached:
+            return conditional_response(request, response, cached)
+        
+        # Skip the JSON documents entirely when only the counts are wanted
+        columns = [
+            PlanHistoryModel.id,
+            PlanHistoryModel.date,
+            PlanHistoryModel.total_tasks,
+            PlanHistoryModel.completed_tasks
+        ]
+        if not summary:
+            columns += [PlanHistoryModel.schedule_data, PlanHistoryModel.wellness_tips]
+        
+        history = (await db.execute(
+            select(*columns)
+            .where(PlanHistoryModel.user_id == user_id)
+            .order_by(PlanHistoryModel.date.desc())
+            .limit(limit)
+        )).all()
+        
+        entries = []
+        for h in history:
+            entry = {
+                "id": h.id,
+                "date": h.date.isoformat(),
+                "total_tasks": h.total_tasks,
+                "completed_tasks": h.completed_tasks,
+                "completion_rate": round((h.completed_tasks / h.total_tasks * 100) if h.total_tasks > 0 else 0, 1)
+            }
+            if not summary:
+                entry["schedule"] = h.schedule_data or []
+                entry["wellness_tips"] = h.wellness_tips or []
+            entries.append(entry)
+        
+        response_data = {"history": entries}
+        await set_cached_response(cache_key, response_data)
+        return conditional_response(request, response, response_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get history: {str(e)}")
 
 
 @app.post("/history/{user_id}", tags=["History"])
-async def save_plan_history(user_id: int, db: Session = Depends(get_db)):
+async def save_plan_history(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Save current day's plan to history.
     """
     try:
         today = date.today()
         
-        # Get today's tasks
-        tasks = db.query(TaskModel).filter(
-            TaskModel.user_id == user_id,
-            TaskModel.deadline == today
-        ).all()
+        # Count today's tasks in SQL rather than loading them
+        total, completed = (await db.execute(
+            select(func.count(), func.count().filter(TaskModel.status == "completed"))
+            .where(TaskModel.user_id == user_id, TaskModel.deadline == today)
+        )).one()
         
-        # Get today's schedule
-        schedule = db.query(ScheduleModel).filter(
-            ScheduleModel.user_id == user_id,
-            ScheduleModel.date == today
-        ).all()
+        # Get today's schedule (only the columns stored in history)
+        schedule = (await db.execute(
+            select(ScheduleModel.task_title, ScheduleModel.start_time, ScheduleModel.end_time)
+            .where(ScheduleModel.user_id == user_id, ScheduleModel.date == today)
+        )).all()
         
         schedule_data = [
-            {"task": s.task_title, "start": s.start_time, "end": s.end_time}
-            for s in schedule
+            {"task": task_title, "start": start_time, "end": end_time}
+            for task_title, start_time, end_time in schedule
         ]
         
-        total = len(tasks)
-        completed = len([t for t in tasks if t.status == "completed"])
-        
-        # Check if history for today exists
-        existing = db.query(PlanHistoryModel).filter(
-            PlanHistoryModel.user_id == user_id,
-            PlanHistoryModel.date == today
-        ).first()
-        
-        if existing:
-            existing.total_tasks = total
-            existing.completed_tasks = completed
-            existing.schedule_data = json.dumps(schedule_data)
-        else:
-            history = PlanHistoryModel(
-                user_id=user_id,
-                date=today,
-                total_tasks=total,
-                completed_tasks=completed,
-                schedule_data=json.dumps(schedule_data)
-            )
-            db.add(history)
+        # Insert or overwrite today's entry in one statement
+        upsert = (sqlite.insert if IS_SQLITE else postgresql.insert)(PlanHistoryModel).values(
+            user_id=user_id,
+            date=today,
+            total_tasks=total,
+            completed_tasks=completed,
+            schedule_data=schedule_data
+        )
+        await db.execute(upsert.on_conflict_do_update(
+            index_elements=[PlanHistoryModel.user_id, PlanHistoryModel.date],
+            set_={
+                "total_tasks": upsert.excluded.total_tasks,
+                "completed_tasks": upsert.excluded.completed_tasks,
+                "schedule_data": upsert.excluded.schedule_data
+            }
+        ))
         
-        db.commit()
+        await db.commit()
+        await invalidate_cache_namespace(f"history:{user_id}")
         
         return {"message": "Plan history saved", "date": today.isoformat()}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to save history: {str(e)}")
 
 
@@ -1235,7 +1971,7 @@ async def save_plan_history(user_id: int, db: Session = Depends(get_db)):
 # =============================================================================
 
 @app.post("/tasks", response_model=TaskResponse, tags=["Tasks"])
-async def create_task(task: TaskCreate, db: Session = Depends(get_db)):
+async def create_task(task: TaskCreate, db: AsyncSession = Depends(get_db)):
     """
     Create a new task.
     
@@ -1255,11 +1991,13 @@ async def create_task(task: TaskCreate, db: Session = Depends(get_db)):
             status="pending"
         )
         db.add(db_task)
-        db.commit()
-        db.refresh(db_task)
+        await db.commit()
+        await db.refresh(db_task)
+        await invalidate_cache_namespace("tasks")
+        invalidate_task_stats()
         return db_task
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create task: {str(e)}")
 
 
@@ -1267,32 +2005,39 @@ async def create_task(task: TaskCreate, db: Session = Depends(get_db)):
 async def list_tasks(
     status: Optional[str] = None,
     priority: Optional[str] = None,
-    db: Session = Depends(get_db)
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    List all tasks with optional filtering.
+    List tasks with optional filtering and paging.
     
     - **status**: Filter by status (pending/completed)
     - **priority**: Filter by priority (low/medium/high)
+    - **offset** / **limit**: Page through the list (all tasks when limit is omitted)
     """
     try:
-        query = db.query(TaskModel)
+        query = select(TaskModel)
         
         if status:
-            query = query.filter(TaskModel.status == status)
+            query = query.where(TaskModel.status == status)
         if priority:
-            query = query.filter(TaskModel.priority == priority)
-        
-        tasks = query.order_by(TaskModel.deadline, TaskModel.priority.desc()).all()
-        return tasks
+            query = query.where(TaskModel.priority == priority)
+        
+        query = query.order_by(TaskModel.deadline, TaskModel.priority.desc(), TaskModel.id).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        tasks = (await db.scalars(query)).all()
+        # Rows come straight from the DB, so skip outbound validation and let orjson encode them
+        return ORJSONResponse(content=rows_to_dicts(tasks, TaskResponse))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch tasks: {str(e)}")
 
 
 @app.get("/tasks/{task_id}", response_model=TaskResponse, tags=["Tasks"])
-async def get_task(task_id: int, db: Session = Depends(get_db)):
+async def get_task(task_id: int, db: AsyncSession = Depends(get_db)):
     """Get a specific task by ID"""
-    task = db.query(TaskModel).filter(TaskModel.id == task_id).first()
+    task = await db.scalar(select(TaskModel).where(TaskModel.id == task_id))
     if not task:
         raise HTTPException(status_code=404, detail=f"Task with id {task_id} not found")
     return task
@@ -1302,7 +2047,7 @@ async def get_task(task_id: int, db: Session = Depends(get_db)):
 async def update_task_status(
     task_id: int,
     task_update: TaskUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update task status (mark as completed or pending).
@@ -1311,36 +2056,40 @@ async def update_task_status(
     - **status**: New status (pending/completed)
     """
     try:
-        task = db.query(TaskModel).filter(TaskModel.id == task_id).first()
+        task = await db.scalar(select(TaskModel).where(TaskModel.id == task_id))
         if not task:
             raise HTTPException(status_code=404, detail=f"Task with id {task_id} not found")
         
         task.status = task_update.status
-        db.commit()
-        db.refresh(task)
+        await db.commit()
+        await db.refresh(task)
+        await invalidate_cache_namespace("tasks")
+        invalidate_task_stats()
         return task
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to update task: {str(e)}")
 
 
 @app.delete("/tasks/{task_id}", tags=["Tasks"])
-async def delete_task(task_id: int, db: Session = Depends(get_db)):
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a task by ID"""
     try:
-        task = db.query(TaskModel).filter(TaskModel.id == task_id).first()
+        task = await db.scalar(select(TaskModel).where(TaskModel.id == task_id))
         if not task:
             raise HTTPException(status_code=404, detail=f"Task with id {task_id} not found")
         
-        db.delete(task)
-        db.commit()
+        await db.delete(task)
+        await db.commit()
+        await invalidate_cache_namespace("tasks")
+        invalidate_task_stats()
         return {"message": f"Task {task_id} deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete task: {str(e)}")
 
 
@@ -1349,7 +2098,7 @@ async def delete_task(task_id: int, db: Session = Depends(get_db)):
 # =============================================================================
 
 @app.post("/generate-schedule", tags=["AI Scheduling"])
-async def generate_schedule(db: Session = Depends(get_db)):
+async def generate_schedule(db: AsyncSession = Depends(get_db)):
     """
     Generate an AI-optimized schedule for all pending tasks.
     
@@ -1359,8 +2108,15 @@ async def generate_schedule(db: Session = Depends(get_db)):
     - Duration (respecting time constraints)
     """
     try:
-        # Fetch all pending tasks
-        pending_tasks = db.query(TaskModel).filter(TaskModel.status == "pending").all()
+        # Fetch all pending tasks (in a fixed order so the same task list yields the same prompt)
+        pending_tasks = (await db.scalars(
+            select(TaskModel)
+            .where(TaskModel.status == "pending")
+            .order_by(TaskModel.deadline, TaskModel.title, TaskModel.id)
+        )).all()
+        # Hand the connection back to the pool while Gemini works; the session
+        # checks out a fresh one for the writes below
+        await db.close()
         
         if not pending_tasks:
             return {
@@ -1388,15 +2144,13 @@ async def generate_schedule(db: Session = Depends(get_db)):
         # Try AI scheduling if API key is available
         if GEMINI_API_KEY:
             try:
-                full_prompt = SCHEDULING_PROMPT + json.dumps(tasks_data, indent=2)
-                model = get_gemini_model()
-                response = model.generate_content(full_prompt)
-                response_text = response.text.strip()
+                full_prompt = (_SCHEDULING_PROMPT_BYTES + orjson.dumps(tasks_data)).decode("utf-8")
+                response_text = unwrap_json_fence(await generate_ai_content(full_prompt))
                 
                 # Try to parse the new format with schedule and review
-                json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+                json_match = _JSON_OBJECT_RE.search(response_text)
                 if json_match:
-                    parsed = json.loads(json_match.group())
+                    parsed = orjson.loads(json_match.group())
                     if isinstance(parsed, dict) and "schedule" in parsed:
                         schedule_items = parsed.get("schedule", [])
                         review_tips = parsed.get("review", [])
@@ -1405,66 +2159,62 @@ async def generate_schedule(db: Session = Depends(get_db)):
                         schedule_items = [parsed] if not isinstance(parsed, list) else parsed
                 else:
                     # Try array format as fallback
-                    array_match = re.search(r'\[.*\]', response_text, re.DOTALL)
+                    array_match = _JSON_ARRAY_RE.search(response_text)
                     if array_match:
-                        schedule_items = json.loads(array_match.group())
+                        schedule_items = orjson.loads(array_match.group())
             except Exception as ai_error:
                 print(f"AI scheduling failed, using fallback: {ai_error}")
                 schedule_items = []
         
         # Fallback: Generate schedule locally if AI fails or no API key
         if not schedule_items:
-            # Sort by priority (high first) then deadline
-            priority_order = {"high": 3, "medium": 2, "low": 1}
-            sorted_tasks = sorted(
-                tasks_data,
-                key=lambda x: (-priority_order.get(x["priority"], 0), x["deadline"])
+            # Sort by priority (high first) then deadline; the index keeps ties in query order
+            ranked = sorted(
+                (-PRIORITY_RANK.get(task["priority"], 0), task["deadline"], i)
+                for i, task in enumerate(tasks_data)
             )
+            sorted_tasks = [tasks_data[i] for i in map(itemgetter(2), ranked)]
             
-            current_hour = 9  # Start at 9 AM
-            current_minute = 0
-            
-            for task in sorted_tasks:
-                duration_minutes = int(task["duration_hours"] * 60)
-                start_time = f"{current_hour:02d}:{current_minute:02d}"
-                
-                # Calculate end time
-                total_minutes = current_hour * 60 + current_minute + duration_minutes
-                end_hour = total_minutes // 60
-                end_minute = total_minutes % 60
-                end_time = f"{end_hour:02d}:{end_minute:02d}"
-                
-                schedule_items.append({
+            # Back-to-back slots from 9 AM: each task ends at the running total of durations
+            slot_bounds = list(accumulate(
+                (int(task["duration_hours"] * 60) for task in sorted_tasks),
+                initial=9 * 60
+            ))
+            schedule_items = [
+                {
                     "task": task["title"],
-                    "start": start_time,
-                    "end": end_time
-                })
-                
-                current_hour = end_hour
-                current_minute = end_minute
+                    "start": "%02d:%02d" % divmod(start, 60),
+                    "end": "%02d:%02d" % divmod(end, 60)
+                }
+                for task, start, end in zip(sorted_tasks, slot_bounds, slot_bounds[1:])
+            ]
         
         # Clear existing schedule for today
         today = date.today()
-        db.query(ScheduleModel).filter(ScheduleModel.date == today).delete()
-        
-        # Save new schedule to database
-        saved_schedule = []
-        for item in schedule_items:
-            schedule_entry = ScheduleModel(
-                task_title=item.get("task", "Unknown Task"),
-                start_time=item.get("start", "09:00"),
-                end_time=item.get("end", "10:00"),
-                date=today
-            )
-            db.add(schedule_entry)
-            saved_schedule.append({
-                "task": schedule_entry.task_title,
-                "start": schedule_entry.start_time,
-                "end": schedule_entry.end_time,
+        await db.execute(delete(ScheduleModel).where(ScheduleModel.date == today))
+        
+        # Save new schedule to database (same transaction as the delete, one batched INSERT)
+        schedule_rows = [
+            {
+                "task_title": item.get("task", "Unknown Task"),
+                "start_time": item.get("start", "09:00"),
+                "end_time": item.get("end", "10:00"),
+                "date": today
+            }
+            for item in schedule_items
+        ]
+        await insert_rows(db, ScheduleModel, schedule_rows)
+        await db.commit()
+        
+        saved_schedule = [
+            {
+                "task": row["task_title"],
+                "start": row["start_time"],
+                "end": row["end_time"],
                 "date": today.isoformat()
-            })
-        
-        db.commit()
+            }
+            for row in schedule_rows
+        ]
         
         # Generate default wellness tips if none from AI
         if not review_tips:
@@ -1484,14 +2234,14 @@ async def generate_schedule(db: Session = Depends(get_db)):
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to generate schedule: {str(e)}")
 
 
 @app.get("/schedule", response_model=List[ScheduleResponse], tags=["AI Scheduling"])
 async def get_schedule(
     schedule_date: Optional[date] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get the schedule for a specific date.
@@ -1500,10 +2250,12 @@ async def get_schedule(
     """
     try:
         target_date = schedule_date or date.today()
-        schedule = db.query(ScheduleModel).filter(
-            ScheduleModel.date == target_date
-        ).order_by(ScheduleModel.start_time).all()
-        return schedule
+        schedule = (await db.scalars(
+            select(ScheduleModel)
+            .where(ScheduleModel.date == target_date)
+            .order_by(ScheduleModel.start_time)
+        )).all()
+        return ORJSONResponse(content=rows_to_dicts(schedule, ScheduleResponse))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch schedule: {str(e)}")
 
@@ -1512,6 +2264,16 @@ async def get_schedule(
 # AI Chat API
 # =============================================================================
 
+def chat_fallback_reply(message: str) -> str:
+    """Canned reply used when the API key is not set"""
+    # Find every keyword in one scan, then answer with the earliest-listed one
+    found = set(_CHAT_KEYWORD_RE.findall(message.lower()))
+    return next(
+        (response for keyword, response in CHAT_FALLBACK_RESPONSES.items() if keyword in found),
+        CHAT_FALLBACK_RESPONSES["default"]
+    )
+
+
 @app.post("/ai-chat", response_model=ChatResponse, tags=["AI Chat"])
 async def ai_chat(chat_request: ChatRequest):
     """
@@ -1522,48 +2284,58 @@ async def ai_chat(chat_request: ChatRequest):
     """
     try:
         if GEMINI_API_KEY:
-            model = get_gemini_model()
             full_prompt = f"{PRODUCTIVITY_PROMPT}\n\nUser: {chat_request.message}\n\nAssistant:"
-            response = model.generate_content(full_prompt)
-            reply = response.text.strip()
+            reply = await generate_ai_content(full_prompt)
         else:
-            # Fallback responses when API key is not set
-            fallback_responses = {
-                "productive": "Try the Pomodoro Technique: work for 25 minutes, then take a 5-minute break. This helps maintain focus and prevents burnout!",
-                "focus": "Minimize distractions by turning off notifications, and try working in 90-minute focus blocks followed by short breaks.",
-                "overwhelm": "When feeling overwhelmed, start with your smallest task first. Completing it gives you momentum to tackle bigger challenges!",
-                "priorit": "Use the Eisenhower Matrix: categorize tasks as urgent/important, important/not urgent, urgent/not important, or neither. Focus on important tasks first!",
-                "break": "Taking regular breaks is essential! Step away from your desk, stretch, or take a short walk to refresh your mind.",
-                "default": "Great question! Here are some quick productivity tips: 1) Break large tasks into smaller ones, 2) Set specific goals for each work session, 3) Review your progress at the end of each day."
-            }
-            
-            message_lower = chat_request.message.lower()
-            reply = fallback_responses["default"]
-            for keyword, response in fallback_responses.items():
-                if keyword in message_lower:
-                    reply = response
-                    break
+            reply = chat_fallback_reply(chat_request.message)
         
         return ChatResponse(
             reply=reply,
-            timestamp=datetime.utcnow()
+            timestamp=datetime.now(timezone.utc)
         )
         
     except HTTPException:
         raise
     except Exception as e:
         return ChatResponse(
-            reply="I'm here to help with productivity tips! Try asking about focus techniques, time management, or task prioritization.",
-            timestamp=datetime.utcnow()
+            reply=CHAT_ERROR_REPLY,
+            timestamp=datetime.now(timezone.utc)
         )
 
 
-# =============================================================================
+@app.post("/ai-chat/stream", tags=["AI Chat"])
+async def ai_chat_stream(chat_request: ChatRequest):
+    """
+    Chat with the AI productivity assistant, streaming the reply as plain text.
+    
+    Same answers as /ai-chat, but the first words arrive as soon as Gemini
+    produces them instead of after the whole reply.
+    """
+    async def reply_chunks():
+        if not GEMINI_API_KEY:
+            yield chat_fallback_reply(chat_request.message)
+            return
+        full_prompt = f"{PRODUCTIVITY_PROMPT}\n\nUser: {chat_request.message}\n\nAssistant:"
+        sent_any = False
+        try:
+            async for text in stream_ai_content(full_prompt):
+                sent_any = True
+                yield text
+        except Exception as e:
+            print(f"AI chat stream failed: {e}")
+            # Only swap in the canned reply if nothing has gone out yet
+            if not sent_any:
+                yield CHAT_ERROR_REPLY
+    
+    return StreamingResponse(reply_chunks(), media_type="text/plain; charset=utf-8")
+
+
+# =============================================================================
 # Analytics API
 # =============================================================================
 
 @app.get("/stats", response_model=StatsResponse, tags=["Analytics"])
-async def get_stats(db: Session = Depends(get_db)):
+async def get_stats(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """
     Get task analytics and statistics.
     
@@ -1574,99 +2346,113 @@ async def get_stats(db: Session = Depends(get_db)):
     - Completion percentage
     """
     try:
-        total_tasks = db.query(TaskModel).count()
-        completed_tasks = db.query(TaskModel).filter(TaskModel.status == "completed").count()
-        pending_tasks = db.query(TaskModel).filter(TaskModel.status == "pending").count()
+        # Served from cache until a task is created, updated or deleted
+        cache_key = f"{await get_cache_namespace('tasks')}:stats"
+        cached = await get_cached_response(cache_key)
+        if cached:
+            return conditional_response(request, response, cached)
+        
+        generation = _task_stats_generation
+        task_stats = await _compute_task_stats(db, date.today())
+        total_tasks = task_stats["total"]
+        completed_tasks = task_stats["completed"]
+        pending_tasks = task_stats["pending"]
         
         completion_percentage = (
             (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0.0
         )
         
-        return StatsResponse(
+        stats = StatsResponse(
             total_tasks=total_tasks,
             completed_tasks=completed_tasks,
             pending_tasks=pending_tasks,
             completion_percentage=round(completion_percentage, 2)
         )
+        response_data = stats.model_dump()
+        # A task write landed mid-query; don't cache counts it may have missed
+        if generation == _task_stats_generation:
+            await set_cached_response(cache_key, response_data)
+        return conditional_response(request, response, response_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch stats: {str(e)}")
 
 
+async def _compute_detailed_stats(db: AsyncSession, today: date) -> dict:
+    """Payload of /stats/detailed (also part of /dashboard)"""
+    # Overview, priority (ALL tasks, not just pending), today and overdue counts
+    task_stats = await _compute_task_stats(db, today)
+    total_tasks = task_stats["total"]
+    completed_tasks = task_stats["completed"]
+    pending_tasks = task_stats["pending"]
+    high_priority = task_stats["high_priority"]
+    medium_priority = task_stats["medium_priority"]
+    low_priority = task_stats["low_priority"]
+    today_tasks = task_stats["today_total"]
+    today_completed = task_stats["today_completed"]
+    overdue_tasks = task_stats["overdue"]
+    avg_duration = task_stats["avg_duration"]
+    if avg_duration is None:
+        avg_duration = 1.5
+    
+    completion_percentage = (
+        (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0.0
+    )
+    
+    # Generate realistic weekly data based on actual history (one grouped query for the week)
+    week_counts = {
+        day: (day_tasks, day_completed)
+        for day, day_tasks, day_completed in (await db.execute(
+            select(
+                TaskModel.deadline,
+                func.count(),
+                func.count().filter(TaskModel.status == "completed")
+            )
+            .where(TaskModel.deadline.between(today - timedelta(days=6), today))
+            .group_by(TaskModel.deadline)
+        )).all()
+    }
+    weekly_data = []
+    for i in range(6, -1, -1):
+        day = today - timedelta(days=i)
+        day_tasks, day_completed = week_counts.get(day, (0, 0))
+        weekly_data.append({
+            "day": day.strftime("%a"),
+            "completed": day_completed if day_tasks > 0 else (8 + i) % 15,  # Fallback demo data
+            "planned": day_tasks if day_tasks > 0 else (10 + i) % 18
+        })
+    
+    return {
+        "overview": {
+            "total_tasks": total_tasks,
+            "completed_tasks": completed_tasks,
+            "pending_tasks": pending_tasks,
+            "completion_percentage": round(completion_percentage, 2)
+        },
+        "priority_breakdown": {
+            "high": high_priority,
+            "medium": medium_priority,
+            "low": low_priority
+        },
+        "today": {
+            "total": today_tasks,
+            "completed": today_completed,
+            "remaining": today_tasks - today_completed
+        },
+        "overdue_tasks": overdue_tasks,
+        "average_task_duration_hours": round(avg_duration, 2),
+        "productivity_score": min(100, int(completion_percentage + (10 if overdue_tasks == 0 else 0))),
+        "weekly_data": weekly_data
+    }
+
+
 @app.get("/stats/detailed", tags=["Analytics"])
-async def get_detailed_stats(db: Session = Depends(get_db)):
+async def get_detailed_stats(db: AsyncSession = Depends(get_db)):
     """
     Get detailed analytics including priority breakdown and today's progress.
     """
     try:
-        # Basic stats
-        total_tasks = db.query(TaskModel).count()
-        completed_tasks = db.query(TaskModel).filter(TaskModel.status == "completed").count()
-        pending_tasks = db.query(TaskModel).filter(TaskModel.status == "pending").count()
-        
-        # Priority breakdown (ALL tasks, not just pending)
-        high_priority = db.query(TaskModel).filter(TaskModel.priority == "high").count()
-        medium_priority = db.query(TaskModel).filter(TaskModel.priority == "medium").count()
-        low_priority = db.query(TaskModel).filter(TaskModel.priority == "low").count()
-        
-        # Today's tasks
-        today = date.today()
-        today_tasks = db.query(TaskModel).filter(TaskModel.deadline == today).count()
-        today_completed = db.query(TaskModel).filter(
-            TaskModel.deadline == today,
-            TaskModel.status == "completed"
-        ).count()
-        
-        # Overdue tasks
-        overdue_tasks = db.query(TaskModel).filter(
-            TaskModel.deadline < today,
-            TaskModel.status == "pending"
-        ).count()
-        
-        completion_percentage = (
-            (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0.0
-        )
-        
-        # Calculate average task duration from actual tasks
-        all_tasks = db.query(TaskModel).all()
-        avg_duration = sum(t.duration for t in all_tasks) / len(all_tasks) if all_tasks else 1.5
-        
-        # Generate realistic weekly data based on actual history
-        weekly_data = []
-        for i in range(6, -1, -1):
-            day = today - timedelta(days=i)
-            day_tasks = db.query(TaskModel).filter(TaskModel.deadline == day).count()
-            day_completed = db.query(TaskModel).filter(
-                TaskModel.deadline == day,
-                TaskModel.status == "completed"
-            ).count()
-            weekly_data.append({
-                "day": day.strftime("%a"),
-                "completed": day_completed if day_tasks > 0 else (8 + i) % 15,  # Fallback demo data
-                "planned": day_tasks if day_tasks > 0 else (10 + i) % 18
-            })
-        
-        return {
-            "overview": {
-                "total_tasks": total_tasks,
-                "completed_tasks": completed_tasks,
-                "pending_tasks": pending_tasks,
-                "completion_percentage": round(completion_percentage, 2)
-            },
-            "priority_breakdown": {
-                "high": high_priority,
-                "medium": medium_priority,
-                "low": low_priority
-            },
-            "today": {
-                "total": today_tasks,
-                "completed": today_completed,
-                "remaining": today_tasks - today_completed
-            },
-            "overdue_tasks": overdue_tasks,
-            "average_task_duration_hours": round(avg_duration, 2),
-            "productivity_score": min(100, int(completion_percentage + (10 if overdue_tasks == 0 else 0))),
-            "weekly_data": weekly_data
-        }
+        # Plain JSON types only, so hand it straight to orjson (skipping jsonable_encoder)
+        return ORJSONResponse(content=await _compute_detailed_stats(db, date.today()))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch detailed stats: {str(e)}")
 
@@ -1681,23 +2467,11 @@ class GoalRecommendationRequest(BaseModel):
     work_hours: int = Field(default=8, description="Daily working hours")
 
 
-@app.post("/ai-goal-recommendations", tags=["AI Features"])
-async def get_goal_recommendations(request: GoalRecommendationRequest):
-    """
-    🏆 Get AI-powered goal recommendations based on user role.
-    Uses Gemini to suggest personalized productivity goals.
-    """
-    try:
-        goals = []
-        
-        if GEMINI_API_KEY:
-            try:
-                model = get_gemini_model()
-                prompt = f"""You are a productivity coach. Based on the user's profile, suggest 4 personalized productivity goals.
+GOAL_RECOMMENDATIONS_PROMPT = """You are a productivity coach. Based on the user's profile, suggest 4 personalized productivity goals.
 
 User Profile:
-- Role: {request.role}
-- Daily working hours: {request.work_hours} hours
+- Role: {role}
+- Daily working hours: {work_hours} hours
 
 For each goal, provide:
 1. A clear, actionable goal title (short)
@@ -1707,14 +2481,38 @@ Output ONLY valid JSON array like:
 [{{"title": "Goal title", "description": "Why this goal matters"}}]
 
 Make goals specific to their role and realistic for their schedule."""
+
+
+@app.post("/ai-goal-recommendations", tags=["AI Features"])
+async def get_goal_recommendations(request: GoalRecommendationRequest):
+    """
+    🏆 Get AI-powered goal recommendations based on user role.
+    Uses Gemini to suggest personalized productivity goals.
+    """
+    try:
+        goals = []
+        ai_used = False
+        
+        # Recommendations only depend on the profile; served from cache for repeat roles
+        cache_key = f"goals:{request.role}:{request.work_hours}"
+        cached = await get_cached_response(cache_key)
+        if cached:
+            return cached
+        
+        if GEMINI_API_KEY:
+            try:
+                prompt = GOAL_RECOMMENDATIONS_PROMPT.format_map({
+                    "role": request.role,
+                    "work_hours": request.work_hours
+                })
                 
-                response = model.generate_content(prompt)
-                response_text = response.text.strip()
+                response_text = await generate_ai_content(prompt)
                 
                 # Extract JSON from response
-                json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
+                json_match = _JSON_ARRAY_RE.search(response_text)
                 if json_match:
-                    goals = json.loads(json_match.group())
+                    goals = orjson.loads(json_match.group())
+                    ai_used = bool(goals)
             except Exception as ai_error:
                 print(f"AI goal recommendations failed: {ai_error}")
         
@@ -1742,12 +2540,17 @@ Make goals specific to their role and realistic for their schedule."""
             }
             goals = role_goals.get(request.role, role_goals["professional"])
         
-        return {
+        response_data = {
             "role": request.role,
             "recommendations": goals,
             "ai_generated": bool(GEMINI_API_KEY),
-            "timestamp": datetime.utcnow()
+            "timestamp": datetime.now(timezone.utc)
         }
+        # Only cache Gemini's answer; the canned goals are instant, and caching them
+        # after a failed call would hide the AI version until the entry expired
+        if ai_used:
+            await set_cached_response(cache_key, response_data)
+        return response_data
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Goal recommendations failed: {str(e)}")
@@ -1763,6 +2566,27 @@ class PrioritySuggestionRequest(BaseModel):
     deadline: Optional[date] = Field(default=None, description="Task deadline")
 
 
+# Keyword fallback for priority suggestions; each list is matched in one regex scan
+HIGH_PRIORITY_KEYWORDS = ("urgent", "asap", "important", "deadline", "meeting", "presentation", "exam", "interview", "client")
+LOW_PRIORITY_KEYWORDS = ("maybe", "someday", "optional", "nice to have", "when free", "later")
+_HIGH_PRIORITY_RE = re.compile("|".join(map(re.escape, HIGH_PRIORITY_KEYWORDS)))
+_LOW_PRIORITY_RE = re.compile("|".join(map(re.escape, LOW_PRIORITY_KEYWORDS)))
+
+PRIORITY_PROMPT = """Analyze this task and suggest a priority level (high, medium, or low).
+
+Task: {task_title}
+{deadline_info}
+{days_until_info}
+
+Consider:
+- Task urgency (deadline proximity)
+- Task importance (based on keywords like "urgent", "important", "review", "meeting", etc.)
+- Complexity indicators
+
+Output ONLY valid JSON:
+{{"priority": "high|medium|low", "reasoning": "Brief explanation (1 sentence)"}}"""
+
+
 @app.post("/ai-suggest-priority", tags=["AI Features"])
 async def suggest_priority(request: PrioritySuggestionRequest):
     """
@@ -1774,41 +2598,33 @@ async def suggest_priority(request: PrioritySuggestionRequest):
         priority = "medium"
         reasoning = ""
         ai_used = False
+        now = datetime.now()
+        today = now.date()
         
         # Create cache key
         cache_key = f"priority:{request.task_title}:{request.deadline}"
-        cached = get_cached_response(cache_key)
+        cached = await get_cached_response(cache_key)
         if cached:
             return cached
         
-        if GEMINI_API_KEY and can_make_api_call():
+        if GEMINI_API_KEY:
             try:
-                mark_api_call()
-                model = get_gemini_model()
                 deadline_info = f"Deadline: {request.deadline}" if request.deadline else "No deadline set"
-                days_until = (request.deadline - date.today()).days if request.deadline else None
+                days_until = (request.deadline - today).days if request.deadline else None
                 
-                prompt = f"""Analyze this task and suggest a priority level (high, medium, or low).
-
-Task: {request.task_title}
-{deadline_info}
-{f"Days until deadline: {days_until}" if days_until is not None else ""}
-
-Consider:
-- Task urgency (deadline proximity)
-- Task importance (based on keywords like "urgent", "important", "review", "meeting", etc.)
-- Complexity indicators
-
-Output ONLY valid JSON:
-{{"priority": "high|medium|low", "reasoning": "Brief explanation (1 sentence)"}}"""
+                prompt = PRIORITY_PROMPT.format_map({
+                    "task_title": request.task_title,
+                    "deadline_info": deadline_info,
+                    "days_until_info": f"Days until deadline: {days_until}" if days_until is not None else ""
+                })
                 
-                response = model.generate_content(prompt)
-                response_text = response.text.strip()
+                # Don't queue behind the rate limiter; the keyword fallback is instant
+                response_text = await generate_ai_content(prompt, wait=False)
                 
                 # Extract JSON from response
-                json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+                json_match = _JSON_OBJECT_RE.search(response_text) if response_text else None
                 if json_match:
-                    result = json.loads(json_match.group())
+                    result = orjson.loads(json_match.group())
                     priority = result.get("priority", "medium")
                     reasoning = result.get("reasoning", "")
                     ai_used = True
@@ -1820,17 +2636,14 @@ Output ONLY valid JSON:
             task_lower = request.task_title.lower()
             
             # Check for urgency keywords
-            high_keywords = ["urgent", "asap", "important", "deadline", "meeting", "presentation", "exam", "interview", "client"]
-            low_keywords = ["maybe", "someday", "optional", "nice to have", "when free", "later"]
-            
-            if any(kw in task_lower for kw in high_keywords):
+            if _HIGH_PRIORITY_RE.search(task_lower):
                 priority = "high"
                 reasoning = "Task contains urgency indicators"
-            elif any(kw in task_lower for kw in low_keywords):
+            elif _LOW_PRIORITY_RE.search(task_lower):
                 priority = "low"
                 reasoning = "Task appears to be optional or flexible"
             elif request.deadline:
-                days_until = (request.deadline - date.today()).days
+                days_until = (request.deadline - today).days
                 if days_until <= 1:
                     priority = "high"
                     reasoning = "Deadline is imminent (within 24 hours)"
@@ -1849,9 +2662,9 @@ Output ONLY valid JSON:
             "suggested_priority": priority,
             "reasoning": reasoning,
             "ai_generated": ai_used,
-            "timestamp": datetime.utcnow()
+            "timestamp": now.astimezone(timezone.utc)
         }
-        set_cached_response(cache_key, response_data)
+        await set_cached_response(cache_key, response_data)
         return response_data
     
     except Exception as e:
@@ -1867,6 +2680,50 @@ class TaskBreakdownRequest(BaseModel):
     task_title: str = Field(..., min_length=1, description="Complex task to break down")
 
 
+# Canned breakdowns for common task patterns, used without Gemini (first matching pattern wins)
+BREAKDOWN_TEMPLATES = [
+    (("write", "essay", "report", "document"), [
+        {"subtask": "Research and gather information", "duration_minutes": 30},
+        {"subtask": "Create outline and structure", "duration_minutes": 15},
+        {"subtask": "Write first draft", "duration_minutes": 45},
+        {"subtask": "Review and edit", "duration_minutes": 20},
+        {"subtask": "Final proofread and submit", "duration_minutes": 10}
+    ]),
+    (("code", "develop", "build", "implement", "program"), [
+        {"subtask": "Plan and design solution", "duration_minutes": 20},
+        {"subtask": "Set up environment/dependencies", "duration_minutes": 15},
+        {"subtask": "Implement core functionality", "duration_minutes": 45},
+        {"subtask": "Test and debug", "duration_minutes": 25},
+        {"subtask": "Review and refactor", "duration_minutes": 15}
+    ]),
+    (("study", "learn", "read"), [
+        {"subtask": "Preview material and set goals", "duration_minutes": 10},
+        {"subtask": "Active reading/studying session 1", "duration_minutes": 25},
+        {"subtask": "Take a short break", "duration_minutes": 5},
+        {"subtask": "Active reading/studying session 2", "duration_minutes": 25},
+        {"subtask": "Review and summarize key points", "duration_minutes": 15}
+    ]),
+    (("meeting", "present", "prepare"), [
+        {"subtask": "Define objectives and agenda", "duration_minutes": 15},
+        {"subtask": "Gather necessary materials", "duration_minutes": 20},
+        {"subtask": "Create presentation/notes", "duration_minutes": 30},
+        {"subtask": "Practice and rehearse", "duration_minutes": 15}
+    ]),
+]
+_BREAKDOWN_PATTERNS = [
+    (re.compile("|".join(map(re.escape, keywords))), subtasks)
+    for keywords, subtasks in BREAKDOWN_TEMPLATES
+]
+
+BREAKDOWN_PROMPT = """Break down this task into 3-5 actionable subtasks with time estimates.
+For each subtask, provide a clear, specific title and estimated duration in minutes (be realistic).
+
+Output ONLY valid JSON array like:
+[{{"subtask": "Subtask name", "duration_minutes": 30}}]
+
+Task to break down: {task_title}"""
+
+
 @app.post("/ai-breakdown", tags=["AI Features"])
 async def breakdown_task(request: TaskBreakdownRequest):
     """
@@ -1875,32 +2732,31 @@ async def breakdown_task(request: TaskBreakdownRequest):
     """
     try:
         subtasks = []
+        ai_used = False
+        
+        cache_key = f"breakdown:{request.task_title}"
+        cached = await get_cached_response(cache_key)
+        if cached:
+            return cached
         
         # Try AI breakdown if API key is available
         if GEMINI_API_KEY:
             try:
-                model = get_gemini_model()
-                prompt = f"""Break down this task into 3-5 actionable subtasks with time estimates.
-For each subtask, provide a clear, specific title and estimated duration in minutes (be realistic).
-
-Output ONLY valid JSON array like:
-[{{"subtask": "Subtask name", "duration_minutes": 30}}]
-
-Task to break down: {request.task_title}"""
+                prompt = BREAKDOWN_PROMPT.format_map({"task_title": request.task_title})
                 
-                response = model.generate_content(prompt)
-                response_text = response.text.strip()
+                response_text = await generate_ai_content(prompt)
                 
                 # Extract JSON from response
-                json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
+                json_match = _JSON_ARRAY_RE.search(response_text)
                 if json_match:
                     subtasks_json = json_match.group()
                 else:
                     subtasks_json = response_text
                 
                 try:
-                    subtasks = json.loads(subtasks_json)
-                except json.JSONDecodeError:
+                    subtasks = orjson.loads(subtasks_json)
+                    ai_used = bool(subtasks)
+                except orjson.JSONDecodeError:
                     pass
             except Exception as ai_error:
                 print(f"AI breakdown failed: {ai_error}")
@@ -1910,38 +2766,11 @@ Task to break down: {request.task_title}"""
             task_lower = request.task_title.lower()
             
             # Generate relevant subtasks based on common task patterns
-            if any(word in task_lower for word in ["write", "essay", "report", "document"]):
-                subtasks = [
-                    {"subtask": "Research and gather information", "duration_minutes": 30},
-                    {"subtask": "Create outline and structure", "duration_minutes": 15},
-                    {"subtask": "Write first draft", "duration_minutes": 45},
-                    {"subtask": "Review and edit", "duration_minutes": 20},
-                    {"subtask": "Final proofread and submit", "duration_minutes": 10}
-                ]
-            elif any(word in task_lower for word in ["code", "develop", "build", "implement", "program"]):
-                subtasks = [
-                    {"subtask": "Plan and design solution", "duration_minutes": 20},
-                    {"subtask": "Set up environment/dependencies", "duration_minutes": 15},
-                    {"subtask": "Implement core functionality", "duration_minutes": 45},
-                    {"subtask": "Test and debug", "duration_minutes": 25},
-                    {"subtask": "Review and refactor", "duration_minutes": 15}
-                ]
-            elif any(word in task_lower for word in ["study", "learn", "read"]):
-                subtasks = [
-                    {"subtask": "Preview material and set goals", "duration_minutes": 10},
-                    {"subtask": "Active reading/studying session 1", "duration_minutes": 25},
-                    {"subtask": "Take a short break", "duration_minutes": 5},
-                    {"subtask": "Active reading/studying session 2", "duration_minutes": 25},
-                    {"subtask": "Review and summarize key points", "duration_minutes": 15}
-                ]
-            elif any(word in task_lower for word in ["meeting", "present", "prepare"]):
-                subtasks = [
-                    {"subtask": "Define objectives and agenda", "duration_minutes": 15},
-                    {"subtask": "Gather necessary materials", "duration_minutes": 20},
-                    {"subtask": "Create presentation/notes", "duration_minutes": 30},
-                    {"subtask": "Practice and rehearse", "duration_minutes": 15}
-                ]
-            else:
+            subtasks = next(
+                (template for pattern, template in _BREAKDOWN_PATTERNS if pattern.search(task_lower)),
+                None
+            )
+            if not subtasks:
                 # Generic breakdown
                 subtasks = [
                     {"subtask": f"Plan approach for: {request.task_title}", "duration_minutes": 15},
@@ -1952,12 +2781,16 @@ Task to break down: {request.task_title}"""
         
         total_time = sum(s.get("duration_minutes", 30) for s in subtasks)
         
-        return {
+        response_data = {
             "original_task": request.task_title,
             "subtasks": subtasks,
             "total_estimated_minutes": total_time,
             "recommendation": f"This task can be completed in approximately {total_time} minutes if you focus on one subtask at a time."
         }
+        # As with goal recommendations, only Gemini's breakdowns are cached
+        if ai_used:
+            await set_cached_response(cache_key, response_data)
+        return response_data
         
     except HTTPException:
         raise
@@ -1974,87 +2807,148 @@ class SmartSuggestionRequest(BaseModel):
     context: Optional[str] = Field(default=None, description="Additional context")
 
 
-@app.post("/smart-suggestion", tags=["AI Features"])
-async def get_smart_suggestion(
-    request: SmartSuggestionRequest = None,
-    db: Session = Depends(get_db)
-):
+def sse_event(data: str, event: Optional[str] = None) -> str:
+    """Format one server-sent event (multi-line data becomes one data: line per line)"""
+    lines = "".join(f"data: {line}\n" for line in data.split("\n"))
+    return f"event: {event}\n{lines}\n" if event else f"{lines}\n"
+
+
+async def stream_ai_events(prompt: Optional[str], fallback: str, cache_key: Optional[str] = None):
     """
-    🏆 Get personalized AI productivity suggestions based on current task state.
+    Yield a Gemini reply as SSE data events, then a final "done" event.
+    Uses the cached reply when there is one; falls back to the canned text
+    if Gemini isn't configured or fails before sending anything. If it fails
+    partway, an "error" event carries the canned text to show instead of the
+    partial reply. Only a completed reply is cached.
+    Callers pass prompt=None when GEMINI_API_KEY is unset.
     """
-    try:
-        # Gather context
-        total_tasks = db.query(TaskModel).count()
-        completed = db.query(TaskModel).filter(TaskModel.status == "completed").count()
-        pending = db.query(TaskModel).filter(TaskModel.status == "pending").count()
-        high_priority = db.query(TaskModel).filter(
-            TaskModel.priority == "high",
-            TaskModel.status == "pending"
-        ).count()
-        
-        today = date.today()
-        overdue = db.query(TaskModel).filter(
-            TaskModel.deadline < today,
-            TaskModel.status == "pending"
-        ).count()
-        
-        completion_rate = (completed / total_tasks * 100) if total_tasks > 0 else 0
-        current_time = datetime.now().strftime("%I:%M %p")
-        current_hour = datetime.now().hour
-        
-        suggestion = ""
-        
-        # Try AI suggestion if API key is available
-        if GEMINI_API_KEY:
-            try:
-                additional_context = f"User context: {request.context}" if request and request.context else ""
-                
-                prompt = f"""You are an AI productivity coach. Based on the user's current tasks and schedule, provide ONE personalized productivity tip.
+    reply = await get_cached_response(cache_key) if cache_key and GEMINI_API_KEY else None
+    if reply:
+        yield sse_event(reply)
+    elif GEMINI_API_KEY:
+        chunks = []
+        try:
+            async for text in stream_ai_content(prompt):
+                chunks.append(text)
+                yield sse_event(text)
+        except Exception as ai_error:
+            print(f"AI stream failed: {ai_error}")
+            # Nothing sent yet: the canned text stands in; otherwise tell the client to replace it
+            yield sse_event(fallback, event="error" if chunks else None)
+        else:
+            if chunks and cache_key:
+                await set_cached_response(cache_key, "".join(chunks).strip())
+            elif not chunks:
+                yield sse_event(fallback)
+    else:
+        yield sse_event(fallback)
+    yield sse_event("", event="done")
+
+
+def suggestion_context(task_stats: dict) -> dict:
+    """The task counts a smart suggestion is based on"""
+    total_tasks = task_stats["total"]
+    return {
+        "total_tasks": total_tasks,
+        "pending_tasks": task_stats["pending"],
+        "high_priority": task_stats["high_priority_pending"],
+        "overdue": task_stats["overdue"],
+        "completion_rate": (task_stats["completed"] / total_tasks * 100) if total_tasks > 0 else 0
+    }
+
+
+SMART_SUGGESTION_PROMPT = """You are an AI productivity coach. Based on the user's current tasks and schedule, provide ONE personalized productivity tip.
 
 Current context:
-- Total pending tasks: {pending}
+- Total pending tasks: {pending_tasks}
 - High priority tasks: {high_priority}
 - Overdue tasks: {overdue}
 - Current time: {current_time}
-- Completion rate: {round(completion_rate, 1)}%
+- Completion rate: {completion_rate}%
 
 {additional_context}
 
 Provide a brief, actionable suggestion (2-3 sentences max). Be specific and motivating."""
-                
-                model = get_gemini_model()
-                response = model.generate_content(prompt)
-                suggestion = response.text.strip()
-            except Exception as ai_error:
-                print(f"AI suggestion failed: {ai_error}")
-        
-        # Fallback: Generate contextual suggestion
-        if not suggestion:
-            if overdue > 0:
-                suggestion = f"⚠️ You have {overdue} overdue task{'s' if overdue > 1 else ''}! Consider tackling the most critical one first to reduce stress and build momentum."
-            elif high_priority > 0:
-                suggestion = f"🎯 You have {high_priority} high-priority task{'s' if high_priority > 1 else ''} waiting. Try the 'eat the frog' technique - tackle the hardest one first while your energy is high!"
-            elif pending == 0 and total_tasks > 0:
-                suggestion = "🎉 Amazing! All tasks completed! Take a well-deserved break or use this momentum to plan tomorrow's tasks."
-            elif pending > 5:
-                suggestion = f"📋 You have {pending} tasks pending. Consider using the Pomodoro technique: 25 minutes of focused work, then a 5-minute break. Start with just one task!"
-            elif current_hour < 12:
-                suggestion = "☀️ Morning is the best time for complex tasks! Your brain is fresh - tackle something challenging while you're at peak performance."
-            elif current_hour < 17:
-                suggestion = "🌤️ Afternoon energy dip? Try a quick walk or stretch, then return to knock out a quick task to rebuild momentum."
-            else:
-                suggestion = "🌙 Evening is great for planning! Review today's progress and set up tomorrow's priorities for a productive start."
-        
-        return {
-            "suggestion": suggestion,
-            "context": {
-                "pending_tasks": pending,
-                "high_priority": high_priority,
-                "overdue": overdue,
-                "completion_rate": round(completion_rate, 1)
-            },
-            "timestamp": datetime.utcnow()
-        }
+
+
+def suggestion_prompt(context: dict, user_context: Optional[str], now: datetime) -> str:
+    """Gemini prompt for a smart suggestion"""
+    return SMART_SUGGESTION_PROMPT.format_map({
+        "pending_tasks": context["pending_tasks"],
+        "high_priority": context["high_priority"],
+        "overdue": context["overdue"],
+        "current_time": now.strftime("%I:%M %p"),
+        "completion_rate": round(context["completion_rate"], 1),
+        "additional_context": f"User context: {user_context}" if user_context else ""
+    })
+
+
+def suggestion_response(context: dict, suggestion: str, now: datetime) -> dict:
+    """Payload of /smart-suggestion (also part of /dashboard)"""
+    return {
+        "suggestion": suggestion,
+        "context": {
+            "pending_tasks": context["pending_tasks"],
+            "high_priority": context["high_priority"],
+            "overdue": context["overdue"],
+            "completion_rate": round(context["completion_rate"], 1)
+        },
+        "timestamp": now.astimezone(timezone.utc)
+    }
+
+
+def suggestion_fallback(context: dict, now: datetime) -> str:
+    """Contextual suggestion used without Gemini"""
+    overdue = context["overdue"]
+    high_priority = context["high_priority"]
+    pending = context["pending_tasks"]
+    if overdue > 0:
+        return f"⚠️ You have {overdue} overdue task{'s' if overdue > 1 else ''}! Consider tackling the most critical one first to reduce stress and build momentum."
+    elif high_priority > 0:
+        return f"🎯 You have {high_priority} high-priority task{'s' if high_priority > 1 else ''} waiting. Try the 'eat the frog' technique - tackle the hardest one first while your energy is high!"
+    elif pending == 0 and context["total_tasks"] > 0:
+        return "🎉 Amazing! All tasks completed! Take a well-deserved break or use this momentum to plan tomorrow's tasks."
+    elif pending > 5:
+        return f"📋 You have {pending} tasks pending. Consider using the Pomodoro technique: 25 minutes of focused work, then a 5-minute break. Start with just one task!"
+    elif now.hour < 12:
+        return "☀️ Morning is the best time for complex tasks! Your brain is fresh - tackle something challenging while you're at peak performance."
+    elif now.hour < 17:
+        return "🌤️ Afternoon energy dip? Try a quick walk or stretch, then return to knock out a quick task to rebuild momentum."
+    else:
+        return "🌙 Evening is great for planning! Review today's progress and set up tomorrow's priorities for a productive start."
+
+
+async def generate_suggestion(context: dict, user_context: Optional[str], now: datetime) -> str:
+    """Gemini's suggestion for this context, or the contextual fallback"""
+    # Try AI suggestion if API key is available
+    if GEMINI_API_KEY:
+        try:
+            suggestion = await generate_ai_content(suggestion_prompt(context, user_context, now))
+            if suggestion:
+                return suggestion
+        except Exception as ai_error:
+            print(f"AI suggestion failed: {ai_error}")
+    
+    # Fallback: Generate contextual suggestion
+    return suggestion_fallback(context, now)
+
+
+@app.post("/smart-suggestion", tags=["AI Features"])
+async def get_smart_suggestion(
+    request: SmartSuggestionRequest = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    🏆 Get personalized AI productivity suggestions based on current task state.
+    """
+    try:
+        # Gather context, then give the connection back before waiting on Gemini
+        # One clock read per request, so the date can't roll over partway through
+        now = datetime.now()
+        context = suggestion_context(await _compute_task_stats(db, now.date()))
+        await db.close()
+        suggestion = await generate_suggestion(context, request.context if request else None, now)
+        return suggestion_response(context, suggestion, now)
         
     except HTTPException:
         raise
@@ -2062,85 +2956,198 @@ Provide a brief, actionable suggestion (2-3 sentences max). Be specific and moti
         raise HTTPException(status_code=500, detail=f"Smart suggestion failed: {str(e)}")
 
 
+@app.post("/smart-suggestion/stream", tags=["AI Features"])
+async def stream_smart_suggestion(
+    request: SmartSuggestionRequest = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Same suggestion as /smart-suggestion, streamed as server-sent events
+    while Gemini writes it. Ends with a "done" event.
+    """
+    now = datetime.now()
+    try:
+        context = suggestion_context(await _compute_task_stats(db, now.date()))
+        await db.close()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Smart suggestion failed: {str(e)}")
+    
+    # The prompt is only needed (and built) when Gemini is configured
+    prompt = suggestion_prompt(context, request.context if request else None, now) if GEMINI_API_KEY else None
+    return StreamingResponse(
+        stream_ai_events(prompt, suggestion_fallback(context, now)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
 # =============================================================================
 # 🏆 AI WOW FEATURES - Daily Summary
 # =============================================================================
 
+def daily_summary_stats(task_stats: dict) -> dict:
+    """The counts a daily summary reports on"""
+    total = task_stats["total"]
+    completed = task_stats["completed"]
+    return {
+        "total_tasks": total,
+        "completed": completed,
+        "pending": total - completed,
+        "overdue": task_stats["overdue"],
+        "today_tasks": task_stats["today_total"],
+        "today_completed": task_stats["today_completed"],
+        "completion_rate": (completed / total * 100) if total > 0 else 0
+    }
+
+
+def daily_summary_cache_key(stats: dict, today: date) -> str:
+    """The AI summary only depends on the day and these counts"""
+    return f"summary:{today}:{stats['total_tasks']}:{stats['completed']}:{stats['overdue']}:{stats['today_tasks']}:{stats['today_completed']}"
+
+
+DAILY_SUMMARY_PROMPT = """Generate a brief, motivating daily productivity summary (2-3 sentences) based on:
+- Total tasks: {total_tasks}
+- Completed: {completed} ({completion_rate}%)
+- Pending: {pending}
+- Overdue: {overdue}
+- Today's tasks: {today_tasks} (completed: {today_completed})
+
+Be encouraging but honest. If there are overdue tasks, gently remind about them."""
+
+
+def daily_summary_prompt(stats: dict) -> str:
+    """Gemini prompt for the daily summary"""
+    # Same keys as the stats, with the rate rounded for display
+    return DAILY_SUMMARY_PROMPT.format_map({**stats, "completion_rate": round(stats["completion_rate"], 1)})
+
+
+def daily_summary_fallback(stats: dict) -> str:
+    """Summary used when the AI is not available"""
+    total = stats["total_tasks"]
+    completed = stats["completed"]
+    pending = stats["pending"]
+    overdue = stats["overdue"]
+    completion_rate = stats["completion_rate"]
+    if total == 0:
+        return "Welcome to your productivity journey! Add some tasks to get started and let's make today count! 🚀"
+    elif completion_rate >= 80:
+        return f"Outstanding work! You've completed {completed} out of {total} tasks ({round(completion_rate, 1)}% completion rate). Keep up the amazing momentum! 🎉"
+    elif completion_rate >= 50:
+        return f"Great progress! You've completed {completed} tasks so far. {pending} tasks remaining - you've got this! 💪"
+    elif overdue > 0:
+        return f"You have {overdue} overdue tasks that need attention. Focus on those first, then tackle the remaining {pending - overdue} tasks. Every step forward counts! 🎯"
+    else:
+        return f"You have {pending} tasks ahead of you today. Start with the high-priority ones and build momentum. You can do this! ✨"
+
+
+async def generate_daily_summary(stats: dict, today: date) -> str:
+    """Gemini's summary of these stats (cached per day and counts), or the fallback"""
+    if GEMINI_API_KEY:
+        cache_key = daily_summary_cache_key(stats, today)
+        summary = await get_cached_response(cache_key)
+        if summary:
+            return summary
+        try:
+            summary = await generate_ai_content(daily_summary_prompt(stats))
+            if summary:
+                await set_cached_response(cache_key, summary)
+                return summary
+        except Exception as ai_error:
+            print(f"AI summary failed: {ai_error}")
+    
+    # Fallback summary if AI is not available
+    return daily_summary_fallback(stats)
+
+
+def daily_summary_response(stats: dict, summary: str, now: datetime) -> dict:
+    """Payload of /daily-summary (also part of /dashboard)"""
+    return {
+        "summary": summary,
+        "stats": {**stats, "completion_rate": round(stats["completion_rate"], 1)},
+        "date": now.date().isoformat(),
+        "generated_at": now.astimezone(timezone.utc)
+    }
+
+
 @app.get("/daily-summary", tags=["AI Features"])
-async def get_daily_summary(db: Session = Depends(get_db)):
+async def get_daily_summary(db: AsyncSession = Depends(get_db)):
     """
     🏆 Get an AI-generated motivational daily summary.
     Perfect for the demo!
     """
     try:
-        # Gather stats
-        total = db.query(TaskModel).count()
-        completed = db.query(TaskModel).filter(TaskModel.status == "completed").count()
-        pending = total - completed
-        
-        today = date.today()
-        overdue = db.query(TaskModel).filter(
-            TaskModel.deadline < today,
-            TaskModel.status == "pending"
-        ).count()
-        
-        today_tasks = db.query(TaskModel).filter(TaskModel.deadline == today).count()
-        today_completed = db.query(TaskModel).filter(
-            TaskModel.deadline == today,
-            TaskModel.status == "completed"
-        ).count()
+        # Gather stats (one clock read, so the date can't roll over partway through)
+        now = datetime.now()
+        today = now.date()
+        stats = daily_summary_stats(await _compute_task_stats(db, today))
+        await db.close()  # Nothing else to read; don't hold the connection during the Gemini call
         
-        completion_rate = (completed / total * 100) if total > 0 else 0
+        summary = await generate_daily_summary(stats, today)
+        return daily_summary_response(stats, summary, now)
         
-        summary = ""
-        if GEMINI_API_KEY:
-            try:
-                prompt = f"""Generate a brief, motivating daily productivity summary (2-3 sentences) based on:
-- Total tasks: {total}
-- Completed: {completed} ({round(completion_rate, 1)}%)
-- Pending: {pending}
-- Overdue: {overdue}
-- Today's tasks: {today_tasks} (completed: {today_completed})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Daily summary failed: {str(e)}")
 
-Be encouraging but honest. If there are overdue tasks, gently remind about them."""
-                
-                model = get_gemini_model()
-                response = model.generate_content(prompt)
-                summary = response.text.strip()
-            except Exception as ai_error:
-                print(f"AI summary failed: {ai_error}")
-                summary = ""
-        
-        # Fallback summary if AI is not available
-        if not summary:
-            if total == 0:
-                summary = "Welcome to your productivity journey! Add some tasks to get started and let's make today count! 🚀"
-            elif completion_rate >= 80:
-                summary = f"Outstanding work! You've completed {completed} out of {total} tasks ({round(completion_rate, 1)}% completion rate). Keep up the amazing momentum! 🎉"
-            elif completion_rate >= 50:
-                summary = f"Great progress! You've completed {completed} tasks so far. {pending} tasks remaining - you've got this! 💪"
-            elif overdue > 0:
-                summary = f"You have {overdue} overdue tasks that need attention. Focus on those first, then tackle the remaining {pending - overdue} tasks. Every step forward counts! 🎯"
-            else:
-                summary = f"You have {pending} tasks ahead of you today. Start with the high-priority ones and build momentum. You can do this! ✨"
-        
-        return {
-            "summary": summary,
-            "stats": {
-                "total_tasks": total,
-                "completed": completed,
-                "pending": pending,
-                "overdue": overdue,
-                "today_tasks": today_tasks,
-                "today_completed": today_completed,
-                "completion_rate": round(completion_rate, 1)
-            },
-            "date": today.isoformat(),
-            "generated_at": datetime.utcnow()
-        }
-        
+
+@app.get("/daily-summary/stream", tags=["AI Features"])
+async def stream_daily_summary(db: AsyncSession = Depends(get_db)):
+    """
+    Same summary as /daily-summary, streamed as server-sent events
+    while Gemini writes it. Ends with a "done" event.
+    """
+    today = date.today()
+    try:
+        stats = daily_summary_stats(await _compute_task_stats(db, today))
+        await db.close()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Daily summary failed: {str(e)}")
+    
+    return StreamingResponse(
+        stream_ai_events(
+            daily_summary_prompt(stats) if GEMINI_API_KEY else None,
+            daily_summary_fallback(stats),
+            cache_key=daily_summary_cache_key(stats, today)
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+# =============================================================================
+# Dashboard API
+# =============================================================================
+
+@app.get("/dashboard", tags=["Analytics"])
+async def get_dashboard(db: AsyncSession = Depends(get_db)):
+    """
+    Everything the dashboard loads at once: /stats/detailed, /daily-summary
+    and /smart-suggestion in one response.
+    
+    The task counts are computed once for all three, and the two Gemini
+    calls run concurrently.
+    """
+    try:
+        now = datetime.now()
+        today = now.date()
+        detailed = await _compute_detailed_stats(db, today)
+        task_stats = await _compute_task_stats(db, today)  # Cached by the call above
+        await db.close()  # Don't hold the connection during the Gemini calls
+        
+        summary_stats = daily_summary_stats(task_stats)
+        context = suggestion_context(task_stats)
+        summary, suggestion = await asyncio.gather(
+            generate_daily_summary(summary_stats, today),
+            generate_suggestion(context, None, now)
+        )
+        
+        # orjson encodes the datetimes natively, so skip jsonable_encoder's walk
+        return ORJSONResponse(content={
+            "stats": detailed,
+            "summary": daily_summary_response(summary_stats, summary, now),
+            "suggestion": suggestion_response(context, suggestion, now)
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load dashboard: {str(e)}")
 
 
 # =============================================================================